@@ -0,0 +1,228 @@
+import httpx
+import logging
+from http import HTTPStatus
+from models.config import ServerEnvs, ClientEnvs
+from models.spend import SpendGet, SpendAdd
+from models.category import Category
+from utils.category_cache import CategoryCache
+from utils.spends_deletion import DeleteSpendsResult, SpendsDeletion
+from utils.json_codec import response_json
+from clients.spends_client import SpendsClient, SPENDS_ADAPTER, CATEGORIES_ADAPTER
+from utils.allure_helpers import allure_async_step
+from utils.sessions import AsyncBaseSession, gather_all
+
+class AsyncSpendsClient:
+    """Асинхронный аналог SpendsClient: те же ручки и модели, методы - корутины.
+
+    add_spendings, get_spendings_by_ids и delete_spendings выполняют запросы параллельно в пределах concurrency сессии.
+    Категории кэшируются так же, как в SpendsClient.
+    """
+
+    session: AsyncBaseSession
+    server_envs: ServerEnvs
+    client_envs: ClientEnvs
+
+    def __init__(
+        self, server_envs: ServerEnvs, client_envs: ClientEnvs, token: str, concurrency: int = 32,
+        category_ttl: float = 60, transport: httpx.AsyncBaseTransport | None = None
+    ):
+        self.server_envs = server_envs
+        self.client_envs = client_envs
+        self.categories = CategoryCache(ttl=category_ttl)
+        self.session = AsyncBaseSession(
+            base_url=server_envs.gateway_url,
+            concurrency=concurrency,
+            transport=transport,
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {token}",
+                "Accept": "application/json"
+            }
+        )
+
+    async def close(self):
+        await self.session.aclose()
+
+    @allure_async_step("API Добавление траты")
+    async def add_spending(self, data: SpendAdd) -> SpendGet:
+        try:
+            if not data.username:
+                data.username = self.client_envs.test_username
+            res = await self.session.post(
+                url=SpendsClient.ADD_SPENDS_ENDPOINT,
+                json=data.model_dump()
+            )
+            if res.status_code == HTTPStatus.CREATED:
+                result = SpendGet.model_validate(response_json(res))
+                logging.info(f"Трата добавлена. ID: {result.id}")
+                return result
+            else:
+                raise Exception(f"Код {res.status_code} | Text {res.text}")
+        except Exception as e:
+            logging.error(f"Ошибка при добавлении траты: {str(e)}", exc_info=True)
+            assert False, str(e)
+
+    async def add_spendings(self, items: list[SpendAdd]) -> list[SpendGet]:
+        """Параллельно добавляет траты, результаты в порядке items"""
+        return await gather_all(self.add_spending(data) for data in items)
+
+    @allure_async_step("API Получение страницы трат")
+    async def get_spendings_page(self, page: int, size: int = SpendsClient.PAGE_SIZE) -> tuple[list[SpendGet], bool]:
+        try:
+            res = await self.session.get(
+                url=SpendsClient.ALL_SPENDS_ENDPOINT,
+                params={"page": page, "size": size, "sort": list(SpendsClient.SPENDS_SORT)}
+            )
+            if res.status_code == HTTPStatus.OK:
+                body = response_json(res)
+                spendings = SPENDS_ADAPTER.validate_python(body["content"])
+                return spendings, body.get("last", len(spendings) < size)
+            else:
+                raise Exception(f"Код {res.status_code} | Text {res.text}")
+        except Exception as e:
+            logging.error(f"Ошибка при получении страницы трат {page}: {str(e)}", exc_info=True)
+            assert False, str(e)
+
+    @allure_async_step("API Получение списка трат")
+    async def get_all_spendings(self, page_size: int = SpendsClient.PAGE_SIZE) -> list[SpendGet]:
+        result, page, last = [], 0, False
+        while not last:
+            spendings, last = await self.get_spendings_page(page, page_size)
+            result.extend(spendings)
+            last = last or not spendings
+            page += 1
+        return result
+
+    @allure_async_step("API Получение траты по ID")
+    async def get_spending_by_id(self, id: str) -> SpendGet:
+        try:
+            res = await self.session.get(
+                url=SpendsClient.GET_SPEND_BY_ID_ENDPOINT.format(id=id)
+            )
+            if res.status_code == HTTPStatus.OK:
+                return SpendGet.model_validate(response_json(res))
+            else:
+                raise Exception(f"Код {res.status_code} | Text {res.text}")
+        except Exception as e:
+            logging.error(f"Ошибка при получении траты по ID: {str(e)}", exc_info=True)
+            assert False, str(e)
+
+    async def get_spendings_by_ids(self, ids: list[str]) -> list[SpendGet]:
+        """Параллельно получает траты по ID, результаты в порядке ids"""
+        return await gather_all(self.get_spending_by_id(id) for id in ids)
+
+    @allure_async_step("API Редактирование траты")
+    async def update_spending(self, data: SpendAdd) -> SpendGet:
+        try:
+            res = await self.session.patch(
+                url=SpendsClient.EDIT_SPEND_ENDPOINT,
+                json=data.model_dump()
+            )
+            if res.status_code == HTTPStatus.OK:
+                return SpendGet.model_validate(response_json(res))
+            else:
+                raise Exception(f"Код {res.status_code} | Text {res.text}")
+        except Exception as e:
+            logging.error(f"Ошибка при обновлении траты: {str(e)}", exc_info=True)
+            assert False, str(e)
+
+    @allure_async_step("API Удаление трат")
+    async def clear_spendings(self, ids: list[str] | None = None) -> DeleteSpendsResult:
+        """Удаляет траты ids, по умолчанию все траты пользователя.
+        Если часть трат удалить не удалось, тест падает, но уже после удаления остальных.
+        """
+        try:
+            if ids is None:
+                ids = [r.id for r in await self.get_all_spendings()]
+        except Exception as e:
+            logging.error(f"Ошибка при удалении всех трат: {str(e)}", exc_info=True)
+            assert False, str(e)
+        if len(ids) == 0:
+            logging.info(f"Таблица трат пустая, удаление не требуется")
+            return DeleteSpendsResult(deleted=0, failed=[])
+
+        result = await self.delete_spendings(ids)
+        assert not result.failed, f"Не удалось удалить траты: {result.failed}"
+        return result
+
+    async def delete_spendings(
+        self, ids: list[str], chunk_size: int = SpendsClient.DELETE_CHUNK_SIZE, attempts: int = 3
+    ) -> DeleteSpendsResult:
+        """Как SpendsClient.delete_spendings, параллельность частей ограничена concurrency сессии"""
+        deletion = SpendsDeletion(ids, chunk_size, attempts)
+
+        async def send(chunk: list[str]) -> httpx.Response:
+            return await self.session.delete(url=SpendsClient.DELETE_SPENDS_ENDPOINT, params=deletion.params(chunk))
+
+        done = await gather_all(deletion.delete_chunk_async(send, chunk) for chunk in deletion.chunks)
+        return deletion.result(done)
+
+    @allure_async_step("API Добавление категории")
+    async def add_category(self, category_name: str) -> Category | dict:
+        try:
+            res = await self.session.post(
+                url=SpendsClient.ADD_CATEGORY_ENDPOINT,
+                json={"name": category_name}
+            )
+            if res.status_code == HTTPStatus.OK:
+                logging.info(f"Категория {category_name} добавлена")
+                category = Category.model_validate(response_json(res))
+                self.categories.put(category)
+                return category
+            elif res.status_code == HTTPStatus.CONFLICT:
+                logging.info(f"Категория {category_name} уже существует")
+                return response_json(res)
+            else:
+                raise Exception(f"Код {res.status_code} | Text {res.text}")
+        except Exception as e:
+            logging.error(f"Ошибка при добавлении категории: {str(e)}", exc_info=True)
+            assert False, str(e)
+
+    @allure_async_step("API Получение списка категорий")
+    async def get_all_categories(self, exclude_archived: bool = False) -> list[Category]:
+        try:
+            res = await self.session.get(
+                url=SpendsClient.GET_CATEGORIES_ENDPOINT,
+                params={"excludeArchived": "true" if exclude_archived else "false"}
+            )
+            if res.status_code == HTTPStatus.OK:
+                categories = CATEGORIES_ADAPTER.validate_python(response_json(res))
+                if not exclude_archived:
+                    self.categories.load(categories)
+                return categories
+            else:
+                raise Exception(f"Код {res.status_code} | Text {res.text}")
+        except Exception as e:
+            logging.error(f"Ошибка при получении категорий: {str(e)}", exc_info=True)
+            assert False, str(e)
+
+    @allure_async_step("API Получение категории по имени")
+    async def get_category_by_name(self, name: str) -> Category | None:
+        """Категория из кэша клиента, при промахе список категорий загружается заново"""
+        category = self.categories.by_name(name)
+        if category is None:
+            await self.get_all_categories()
+            category = self.categories.by_name(name)
+        return category
+
+    def invalidate_categories(self, id: str | None = None):
+        """Сбрасывает кэш категорий после их изменения в обход клиента"""
+        self.categories.invalidate(id)
+
+    @allure_async_step("API Обновление категории")
+    async def update_category(self, category_data: Category) -> Category:
+        try:
+            res = await self.session.patch(
+                url=SpendsClient.UPDATE_CATEGORY_ENDPOINT,
+                json=category_data.model_dump()
+            )
+            if res.status_code == HTTPStatus.OK:
+                logging.info(f"Категория {category_data.name} обновлена")
+                category = Category.model_validate(response_json(res))
+                self.categories.put(category)
+                return category
+            else:
+                raise Exception(f"Код {res.status_code} | Text {res.text}")
+        except Exception as e:
+            logging.error(f"Ошибка при обновлении категории: {str(e)}", exc_info=True)
+            assert False, str(e)
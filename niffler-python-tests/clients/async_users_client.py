@@ -0,0 +1,78 @@
+import logging
+from http import HTTPStatus
+from models.config import ServerEnvs
+from clients.users_client import UsersClient
+from utils.allure_helpers import allure_async_step
+from utils.json_codec import response_json
+from utils.sessions import AsyncBaseSession
+
+class AsyncUsersClient:
+    """Асинхронный аналог UsersClient: те же ручки, методы - корутины"""
+
+    session: AsyncBaseSession
+    server_envs: ServerEnvs
+
+    def __init__(self, server_envs: ServerEnvs, token: str, concurrency: int = 32):
+        self.server_envs = server_envs
+        self.session = AsyncBaseSession(
+            base_url=server_envs.gateway_url,
+            concurrency=concurrency,
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {token}",
+                "Accept": "application/json"
+            }
+        )
+
+    async def close(self):
+        await self.session.aclose()
+
+    @allure_async_step("API Получение текущего пользователя")
+    async def get_current_user(self) -> dict:
+        try:
+            res = await self.session.get(url=UsersClient.CURRENT_USER_ENDPOINT)
+            if res.status_code == HTTPStatus.OK:
+                return response_json(res)
+            else:
+                raise Exception(f"Код {res.status_code} | Text {res.text}")
+        except Exception as e:
+            logging.error(f"Ошибка при получении текущего пользователя: {str(e)}", exc_info=True)
+            assert False
+
+    @allure_async_step("API Обновление имени профиля")
+    async def update_profile_name(self, name: str):
+        current_user = await self.get_current_user()
+        data = {
+            "fullname": name,
+            "id": current_user["id"],
+            "photo": "",
+            "username": current_user["username"]
+        }
+        try:
+            res = await self.session.patch(
+                url=UsersClient.UPDATE_USER_ENDPOINT,
+                json=data
+            )
+            if res.status_code == HTTPStatus.OK:
+                logging.info(f"Имя профиля изменено на {name}")
+            else:
+                raise Exception(f"Код {res.status_code} | Text {res.text}")
+        except Exception as e:
+            logging.error(f"Ошибка при обновлении профиля: {str(e)}", exc_info=True)
+            assert False
+
+    @allure_async_step("API Получение статистики трат")
+    async def get_total_stat(self, stat_currency: str | None = None, filter_currency: str | None = None) -> dict:
+        params = {"statCurrency": stat_currency, "filterCurrency": filter_currency}
+        try:
+            res = await self.session.get(
+                url=f"{UsersClient.STAT_ENDPOINT}/total",
+                params={key: value for key, value in params.items() if value}
+            )
+            if res.status_code == HTTPStatus.OK:
+                return response_json(res)
+            else:
+                raise Exception(f"Код {res.status_code} | Text {res.text}")
+        except Exception as e:
+            logging.error(f"Ошибка при получении статистики: {str(e)}", exc_info=True)
+            assert False
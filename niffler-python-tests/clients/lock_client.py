@@ -1,17 +1,21 @@
 import pytest
 import threading
-import time
 import os
 import logging
 from pathlib import Path
 import json
+from utils.lock import FileLock, SharedCounter
+from utils.session_broker import SessionBroker
+from utils.lock_stats import LockStats, lock_stats
 
 class LockManager:
     """Менеджер блокировок для тестов"""
     
-    def __init__(self):
+    def __init__(self, broker: SessionBroker | None = None, stats: LockStats = lock_stats):
         self.lock_dir = Path(__file__).resolve().parent.parent / "lock"
         self.lock_dir.mkdir(exist_ok=True)
+        self.broker = broker
+        self.stats = stats
         
         self._lock = threading.Lock()
     
@@ -22,9 +26,24 @@ class LockManager:
         lock_data_path: str = None, 
         lock_count_path: str = None, 
         create_func=None,
-        cleanup_func=None
+        cleanup_func=None,
+        shared: bool = False
     ):
-        """Создает блокировку с возможностью выполнения функций создания и очистки"""
+        """Создает блокировку с возможностью выполнения функций создания и очистки.
+        
+        Без lock_count_path блокировка удерживается всё время использования.
+        С lock_count_path она берётся только на создание данных и изменение счетчика,
+        а данные общие для всех участников, пока счетчик не опустится до нуля.
+        Если ресурс с таким name уже создан контроллером xdist, блокировки не нужны.
+        
+        shared=True (только без lock_count_path) - общая блокировка для читателей:
+        они выполняются параллельно, а монопольный захват того же файла ждет их всех.
+        """
+        
+        if self.broker and self.broker.provides(name):
+            logging.info(f"Ресурс {name} получен от контроллера xdist")
+            yield self.broker.get(name)
+            return
         
         if lock_file_path:
             lock_file_path = self.lock_dir / lock_file_path
@@ -33,97 +52,95 @@ class LockManager:
         if lock_count_path:
             lock_count_path = self.lock_dir / lock_count_path
         
-        got_lock = False
+        file_lock = FileLock(lock_file_path, shared=shared and not lock_count_path)
         data = None
         
-        while not got_lock:
+        if not lock_count_path:
+            file_lock.acquire()
+            mode = "общая" if file_lock.shared else "монопольная"
+            logging.info(f"Блокировка {lock_file_path} ({mode}) создана {os.getpid()}_{threading.get_ident()}")
             try:
-                with open(lock_file_path, 'x') as f:
-                    f.write(f"locked_by_{os.getpid()}_{threading.get_ident()}")
-                got_lock = True
-                
-                if create_func:
-                    data = create_func()
-                    if lock_data_path and data:
-                        with open(lock_data_path, 'w') as f:
-                            json.dump(data, f, ensure_ascii=False, indent=4)
-                
-                logging.info(f"Блокировка {lock_file_path} создана {os.getpid()}_{threading.get_ident()}")
-            except FileExistsError:
-                time.sleep(0.5)
-                if lock_data_path and os.path.exists(lock_data_path):
-                    with open(lock_data_path, "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                        break
-                elif not lock_data_path and lock_count_path and os.path.exists(lock_count_path):
-                    break
+                data = self._create_data(create_func, lock_data_path)
+                yield data
+            finally:
+                self.release_lock(file_lock, lock_data_path=lock_data_path)
+                self.stats.record(name, file_lock)
+            return
         
-        if lock_count_path:
+        with file_lock:
+            # Счетчик сам отбрасывает ссылки упавших процессов: если живых участников нет,
+            # оставшиеся от них данные считаются устаревшими и создаются заново
+            created = self.get_count(lock_count_path) > 0 and (not lock_data_path or lock_data_path.exists())
+            if created and lock_data_path:
+                with open(lock_data_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            elif not created:
+                data = self._create_data(create_func, lock_data_path)
+                logging.info(f"Данные блокировки {lock_file_path} созданы {os.getpid()}_{threading.get_ident()}")
             self.inc_count(name, lock_count_path)
-            
-        yield data
+        self.stats.record(name, file_lock)
         
-        if not lock_count_path:
-            self.release_lock(lock_file_path=lock_file_path, lock_data_path=lock_data_path)
-            
-        else:
+        try:
+            yield data
+        finally:
+            file_lock.acquire()
             left = self.dec_count(name, lock_count_path)
-            if left == 0:
+            if left > 0:
+                file_lock.release()
+            else:
                 if cleanup_func and data:
                     try:
                         cleanup_func(data)
                     except Exception as e:
                         logging.error(f"Ошибка при выполнении cleanup функции: {e}", exc_info=True)
                 self.release_lock(
-                    lock_file_path=lock_file_path, 
+                    file_lock, 
                     lock_data_path=lock_data_path, 
                     lock_count_path=lock_count_path
                 )
+            self.stats.record(name, file_lock)
     
-    def inc_count(self, name: str, lock_count_path: str):
-        """Увеличивает счетчик использования блокировки"""
-            
-        if not os.path.exists(lock_count_path):
-            with open(lock_count_path, "w") as f:
-                f.write("1")
-            return 1
-            
-        with open(lock_count_path, "r+") as f:
-            count = int(f.read())
-            count += 1
-            f.seek(0)
-            f.write(str(count))
-            f.truncate()
+    @staticmethod
+    def _create_data(create_func, lock_data_path: Path = None):
+        """Выполняет функцию создания и сохраняет результат для остальных участников"""
+        if not create_func:
+            return None
+        data = create_func()
+        if lock_data_path and data:
+            with open(lock_data_path, 'w', encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=4)
+        return data
+    
+    def inc_count(self, name: str, lock_count_path: Path) -> int:
+        """Атомарно увеличивает счетчик использования блокировки"""
+        count = SharedCounter(lock_count_path).increment()
         logging.info(f"lock count ({name}) {count}")
         return count
     
-    def dec_count(self, name: str, lock_count_path: str):
-        """Уменьшает счетчик использования блокировки"""
-            
-        if not os.path.exists(lock_count_path):
-            return 0
-            
-        with open(lock_count_path, "r+") as f:
-            count = int(f.read())
-            count -= 1
-            f.seek(0)
-            f.write(str(count))
-            f.truncate()
+    def dec_count(self, name: str, lock_count_path: Path) -> int:
+        """Атомарно уменьшает счетчик использования блокировки"""
+        count = SharedCounter(lock_count_path).decrement()
         logging.info(f"lock count ({name}) {count}")
         return count
     
-    def release_lock(self, lock_file_path: str = None, lock_data_path: str = None, lock_count_path: str = None):
-        """Убирает блокировку и связанные файлы"""
+    @staticmethod
+    def get_count(lock_count_path: Path) -> int:
+        """Число живых участников блокировки"""
+        return SharedCounter(lock_count_path).value()
+    
+    def release_lock(self, file_lock: FileLock, lock_data_path: Path = None, lock_count_path: Path = None):
+        """Убирает связанные файлы и блокировку"""
         try:
-            if lock_file_path and lock_file_path.exists():
-                lock_file_path.unlink()
-                logging.info(f"Блокировка {lock_file_path} убрана {os.getpid()}_{threading.get_ident()}")
-            
-            if lock_count_path and lock_count_path.exists():
-                lock_count_path.unlink()
+            if lock_count_path:
+                counter = SharedCounter(lock_count_path)
+                counter.path.unlink(missing_ok=True)
+                counter.lock_path.unlink(missing_ok=True)
                 
             if lock_data_path and lock_data_path.exists():
                 lock_data_path.unlink()
                 
         except Exception as e:
-            logging.error(f"Ошибка при удалении блокировки: {e}", exc_info=True)
\ No newline at end of file
+            logging.error(f"Ошибка при удалении файлов блокировки: {e}", exc_info=True)
+        finally:
+            file_lock.release(unlink=True)
+            logging.info(f"Блокировка {file_lock.path} убрана {os.getpid()}_{threading.get_ident()}")
\ No newline at end of file
@@ -7,6 +7,7 @@ from http import HTTPStatus
 import pkce
 from requests import Response
 from models.auth_user import TokenData
+from utils.token_cache import TokenCache
 
 class OAuthClient:
     """Авторизует по Oauth2.0"""
@@ -19,6 +20,7 @@ class OAuthClient:
     AUTHORIZED_URI = "{frontend_url}/authorized"
     LOGIN_ENDPOINT = "/login"
     TOKEN_ENDPOINT = "/oauth2/token"
+    JWKS_ENDPOINT = "/oauth2/jwks"
     
     def __init__(self, server_envs: ServerEnvs):
         """Генерируем code_verifier и code_challenge."""
@@ -119,4 +121,33 @@ class OAuthClient:
             code_challenge=self.code_challenge,
             id_token=self.id_token,
             cookies=cookie_list
-        )
\ No newline at end of file
+        )
+    
+    def get_key_ids(self) -> set[str]:
+        """Идентификаторы ключей, которыми auth сейчас подписывает токены"""
+        response = self.session.get(url=self.JWKS_ENDPOINT)
+        response.raise_for_status()
+        return {key["kid"] for key in response.json().get("keys", [])}
+    
+    def get_cached_token(self, username: str, password: str, token_cache: TokenCache | None) -> TokenData:
+        """Токен из кэша, если он еще действителен, иначе регистрация и новый токен.
+        
+        Вместо регистрации и четырех запросов авторизации при попадании в кэш
+        выполняется один запрос ключей auth.
+        """
+        if token_cache is not None:
+            try:
+                key_ids = self.get_key_ids()
+            except Exception as e:
+                logging.warning(f"Не удалось получить ключи auth, кэш токенов не используется: {e}")
+            else:
+                token_data = token_cache.get(username, self.server_envs.auth_url, key_ids)
+                if token_data is not None:
+                    self.token = token_data.access_token
+                    self.id_token = token_data.id_token
+                    return token_data
+        self.register(username, password)
+        token_data = self.get_token(username, password)
+        if token_cache is not None:
+            token_cache.put(username, self.server_envs.auth_url, token_data)
+        return token_data
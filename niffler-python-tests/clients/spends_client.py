@@ -1,11 +1,36 @@
 import allure
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from http import HTTPStatus
+from typing import Iterable, Iterator, NamedTuple, Sequence
 from models.config import ServerEnvs, ClientEnvs
 from models.spend import SpendGet, SpendAdd
 from models.category import Category, CategoryAdd
+from pydantic import TypeAdapter
+from requests import Response
+from utils.category_cache import CategoryCache
+from utils.concurrency import run_in_threads
+from utils.spends_deletion import DeleteSpendsResult, SpendsDeletion
+from utils.json_codec import response_json
 from utils.sessions import BaseSession
 
+# Валидаторы списков собираются один раз: TypeAdapter проверяет весь список за один вызов pydantic-core
+SPENDS_ADAPTER = TypeAdapter(list[SpendGet])
+CATEGORIES_ADAPTER = TypeAdapter(list[Category])
+
+
+class BulkSpendResult(NamedTuple):
+    """Результат add_spendings_bulk для одной траты: созданная трата, пропуск дубликата или ошибка"""
+    data: SpendAdd
+    spend: SpendGet | None = None
+    skipped: bool = False
+    error: str | None = None
+
+
+def spend_key(amount: float | None, category: str | None, currency: str, description: str) -> tuple:
+    return amount, category, currency, description
+
+
 class SpendsClient:
     
     session: BaseSession
@@ -25,9 +50,18 @@ class SpendsClient:
     
     CURRENCIES_ENDPOINT = "/api/currencies"
     
-    def __init__(self, server_envs: ServerEnvs, client_envs: ClientEnvs, token: str):
+    # Spring ограничивает size 2000, страница поменьше быстрее разбирается, пока качается следующая
+    PAGE_SIZE = 500
+    # Параметр sort в Spring заменяет порядок ручки, поэтому дата по убыванию, как в UI, передается явно,
+    # а id по убыванию разводит траты с одинаковой датой, чтобы страницы не пересекались
+    SPENDS_SORT = ("spendDate,desc", "id,desc")
+    # id в query: uuid и закодированная запятая, 39 символов. 100 id - около 4 КБ, вдвое меньше лимита Tomcat на заголовки
+    DELETE_CHUNK_SIZE = 100
+    
+    def __init__(self, server_envs: ServerEnvs, client_envs: ClientEnvs, token: str, category_ttl: float = 60):
         self.server_envs = server_envs
         self.client_envs = client_envs
+        self.categories = CategoryCache(ttl=category_ttl)
         self.session = BaseSession(base_url=server_envs.gateway_url)
         self.session.headers.update({
             "Content-Type": "application/json",
@@ -45,7 +79,7 @@ class SpendsClient:
                 json=data.model_dump()
             )
             if res.status_code == HTTPStatus.CREATED:
-                result = SpendGet.model_validate(res.json())
+                result = SpendGet.model_validate(response_json(res))
                 logging.info(f"Трата добавлена. ID: {result.id}")
                 return result
             else:
@@ -54,24 +88,99 @@ class SpendsClient:
             logging.error(f"Ошибка при добавлении траты: {str(e)}", exc_info=True)
             assert False, str(e)
     
-    @allure.step("API Получение списка трат")
-    def get_all_spendings(self) -> list[SpendGet]:
+    def add_spendings_bulk(
+        self, items: list[SpendAdd], concurrency: int = 8, existing: Iterable[SpendGet] | None = None
+    ) -> list[BulkSpendResult]:
+        """Параллельно добавляет траты и возвращает результаты в порядке items.
+
+        Трата пропускается, если у пользователя уже есть трата с такими же суммой, категорией,
+        валютой и описанием, или она повторяется в items. Уже существующие траты берутся из existing
+        или читаются постранично и индексируются в множество, поэтому проверка не зависит от их числа.
+        Ошибка добавления одной траты не прерывает остальные и возвращается в ее результате.
+        Запросы идут через одну сессию: соединения берутся из общего пула транспорта.
+        """
+        if existing is None:
+            existing = self.iter_spendings()
+        seen = {spend_key(s.amount, s.category.name, s.currency, s.description) for s in existing}
+        results: list[BulkSpendResult | None] = [None] * len(items)
+        to_add: list[int] = []
+        for i, data in enumerate(items):
+            key = spend_key(data.amount, data.category.name if data.category else None, data.currency, data.description)
+            if key in seen:
+                results[i] = BulkSpendResult(data=data, skipped=True)
+            else:
+                seen.add(key)
+                to_add.append(i)
+
+        def add(data: SpendAdd) -> BulkSpendResult:
+            try:
+                return BulkSpendResult(data=data, spend=self.add_spending(data))
+            except AssertionError as e:
+                return BulkSpendResult(data=data, error=str(e))
+
+        added = run_in_threads("API Добавление трат", add, [items[i] for i in to_add], concurrency, "spends_bulk")
+        for i, result in zip(to_add, added):
+            results[i] = result
+
+        failed = [r for r in results if r.error]
+        logging.info(
+            f"Добавление трат: добавлено {len(to_add) - len(failed)}, "
+            f"пропущено дубликатов {len(items) - len(to_add)}, ошибок {len(failed)}"
+        )
+        for result in failed:
+            logging.error(f"Трата {result.data.description} не добавлена: {result.error}")
+        return results
+
+    @allure.step("API Получение страницы трат")
+    def get_spendings_page(
+        self, page: int, size: int = PAGE_SIZE, search_query: str | None = None, sort: Sequence[str] = SPENDS_SORT
+    ) -> tuple[list[SpendGet], bool]:
+        """Страница трат и признак последней страницы.
+        По умолчанию порядок тот же, что на главной странице UI: по дате по убыванию, затем по id."""
         try:
+            params = {"page": page, "size": size, "sort": list(sort)}
+            if search_query:
+                params["searchQuery"] = search_query
             res = self.session.get(
                 url=self.ALL_SPENDS_ENDPOINT, 
-                params={"size": 1000}
+                params=params
             )
             if res.status_code == HTTPStatus.OK:
-                user_items = [item for item in res.json()["content"]]
-                if len(user_items) == 0:
-                    return []
-                return [SpendGet.model_validate(item) for item in user_items]
+                body = response_json(res)
+                spendings = SPENDS_ADAPTER.validate_python(body["content"])
+                return spendings, body.get("last", len(spendings) < size)
             else:
                 raise Exception(f"Код {res.status_code} | Text {res.text}")
         except Exception as e:
-            logging.error(f"Ошибка при получении всех трат: {str(e)}", exc_info=True)
+            logging.error(f"Ошибка при получении страницы трат {page}: {str(e)}", exc_info=True)
             assert False, str(e)
     
+    def iter_spendings(
+        self, page_size: int = PAGE_SIZE, search_query: str | None = None, sort: Sequence[str] = SPENDS_SORT
+    ) -> Iterator[SpendGet]:
+        """Лениво обходит все траты пользователя по страницам page_size.
+        
+        Пока вызывающий код обрабатывает текущую страницу, следующая запрашивается в фоновом потоке,
+        в памяти одновременно не больше двух страниц. Если обход прерван, генератор дожидается
+        уже отправленного запроса следующей страницы.
+        """
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="spends_pages") as executor:
+            page = 0
+            future = executor.submit(self.get_spendings_page, page, page_size, search_query, sort)
+            while True:
+                spendings, last = future.result()
+                last = last or not spendings
+                if not last:
+                    page += 1
+                    future = executor.submit(self.get_spendings_page, page, page_size, search_query, sort)
+                yield from spendings
+                if last:
+                    return
+    
+    @allure.step("API Получение списка трат")
+    def get_all_spendings(self, page_size: int = PAGE_SIZE) -> list[SpendGet]:
+        return list(self.iter_spendings(page_size))
+    
     @allure.step("API Получение траты по ID")
     def get_spending_by_id(self, id: str) -> SpendGet:
         try:
@@ -79,7 +188,7 @@ class SpendsClient:
                 url=self.GET_SPEND_BY_ID_ENDPOINT.format(id=id)
             )
             if res.status_code == HTTPStatus.OK:
-                return SpendGet.model_validate(res.json())
+                return SpendGet.model_validate(response_json(res))
             else:
                 raise Exception(f"Код {res.status_code} | Text {res.text}")
         except Exception as e:
@@ -94,7 +203,7 @@ class SpendsClient:
                 json=data.model_dump()
             )
             if res.status_code == HTTPStatus.OK:
-                return SpendGet.model_validate(res.json())
+                return SpendGet.model_validate(response_json(res))
             else:
                 raise Exception(f"Код {res.status_code} | Text {res.text}")
         except Exception as e:
@@ -102,34 +211,42 @@ class SpendsClient:
             assert False, str(e)
     
     @allure.step("API Удаление трат")
-    def clear_spendings(self, ids: list[str] | None = None):
-        """Удаление трат без возврата ответа.
-        Но, если надо проверить саму ручку удаления, то надо добавить возврат response.
+    def clear_spendings(self, ids: list[str] | None = None, concurrency: int = 4) -> DeleteSpendsResult:
+        """Удаляет траты ids, по умолчанию все траты пользователя.
+        Если часть трат удалить не удалось, тест падает, но уже после удаления остальных.
         """
         try:
             if ids is None:
-                all_spendings = self.get_all_spendings()
-                ids = [r.id for r in all_spendings] if len(all_spendings) > 0 else []
-            if len(ids) == 0:
-                logging.info(f"Таблица трат пустая, удаление не требуется")
-                return
-            
-            params = {
-                "ids": ",".join(ids) if len(ids) > 1 else ids[0]
-            }
-            logging.info(f"Удаление трат: {ids}")
-            res = self.session.delete(
-                url=self.DELETE_SPENDS_ENDPOINT, 
-                params=params
-            )
-            if res.status_code == HTTPStatus.OK:
-                logging.info(f"Все траты удалены")
-            else:
-                raise Exception(f"Код {res.status_code} | Text {res.text}")
-            
+                ids = [r.id for r in self.iter_spendings()]
         except Exception as e:
             logging.error(f"Ошибка при удалении всех трат: {str(e)}", exc_info=True)
             assert False, str(e)
+        if len(ids) == 0:
+            logging.info(f"Таблица трат пустая, удаление не требуется")
+            return DeleteSpendsResult(deleted=0, failed=[])
+        
+        result = self.delete_spendings(ids, concurrency=concurrency)
+        assert not result.failed, f"Не удалось удалить траты: {result.failed}"
+        return result
+    
+    def delete_spendings(
+        self, ids: list[str], chunk_size: int = DELETE_CHUNK_SIZE, concurrency: int = 4, attempts: int = 3
+    ) -> DeleteSpendsResult:
+        """Удаляет траты частями по chunk_size id, части отправляются параллельно в concurrency потоков.
+        
+        Часть, которую не удалось удалить, повторяется до attempts раз с растущей паузой (SpendsDeletion).
+        Не падает на ошибках, а возвращает число удаленных и список неудаленных id.
+        """
+        deletion = SpendsDeletion(ids, chunk_size, attempts)
+        
+        def send(chunk: list[str]) -> Response:
+            return self.session.delete(url=self.DELETE_SPENDS_ENDPOINT, params=deletion.params(chunk))
+        
+        done = run_in_threads(
+            f"API Удаление {len(ids)} трат", lambda chunk: deletion.delete_chunk(send, chunk),
+            deletion.chunks, concurrency, "spends_delete"
+        )
+        return deletion.result(done)
             
     @allure.step("API Добавление категории")    
     def add_category(self, category_name: str) -> Category | dict:
@@ -141,10 +258,12 @@ class SpendsClient:
             )
             if res.status_code == HTTPStatus.OK:
                 logging.info(f"Категория {category_name} добавлена")
-                return Category.model_validate(res.json())
+                category = Category.model_validate(response_json(res))
+                self.categories.put(category)
+                return category
             elif res.status_code == HTTPStatus.CONFLICT:
                 logging.info(f"Категория {category_name} уже существует")
-                return res.json()
+                return response_json(res)
             else:
                 raise Exception(f"Код {res.status_code} | Text {res.text}")
         except Exception as e:
@@ -162,7 +281,10 @@ class SpendsClient:
                 params=params
             )
             if res.status_code == HTTPStatus.OK:
-                return [Category.model_validate(item) for item in res.json()]
+                categories = CATEGORIES_ADAPTER.validate_python(response_json(res))
+                if not exclude_archived:
+                    self.categories.load(categories)
+                return categories
             else:
                 raise Exception(f"Код {res.status_code} | Text {res.text}")
         except Exception as e:
@@ -170,15 +292,26 @@ class SpendsClient:
             assert False, str(e)
     
     @allure.step("API Получение категории по имени")  
-    def get_category_by_name(self, name: str) -> Category:
-        try:
-            all_categories = self.get_all_categories()
-            result = next((c for c in all_categories if c.name == name), None)
-            return Category.model_validate(result) if result else result
-
-        except Exception as e:
-            logging.error(f"Ошибка при получении категории по имени: {str(e)}", exc_info=True)
-            assert False
+    def get_category_by_name(self, name: str) -> Category | None:
+        """Категория из кэша клиента. При промахе список категорий загружается заново:
+        категория могла появиться в обход клиента или устареть по ttl"""
+        category = self.categories.by_name(name)
+        if category is None:
+            self.get_all_categories()
+            category = self.categories.by_name(name)
+        return category
+    
+    @allure.step("API Получение категории по ID")
+    def get_category_by_id(self, id: str) -> Category | None:
+        category = self.categories.by_id(id)
+        if category is None:
+            self.get_all_categories()
+            category = self.categories.by_id(id)
+        return category
+    
+    def invalidate_categories(self, id: str | None = None):
+        """Сбрасывает кэш категорий после их изменения в обход клиента, например удаления через БД"""
+        self.categories.invalidate(id)
     
     @allure.step("API Обновление категории")
     def update_category(self, category_data: Category) -> Category:
@@ -189,7 +322,9 @@ class SpendsClient:
             )
             if res.status_code == HTTPStatus.OK:
                 logging.info(f"Категория {category_data.name} обновлена")
-                return Category.model_validate(res.json())
+                category = Category.model_validate(response_json(res))
+                self.categories.put(category)
+                return category
             else:
                 raise Exception(f"Код {res.status_code} | Text {res.text}")
         except Exception as e:
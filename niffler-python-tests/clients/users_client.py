@@ -2,6 +2,7 @@ import allure
 import logging
 from http import HTTPStatus
 from models.config import ServerEnvs
+from utils.json_codec import response_json
 from utils.sessions import BaseSession
 
 class UsersClient:
@@ -28,7 +29,7 @@ class UsersClient:
         try:
             res = self.session.get(url=self.CURRENT_USER_ENDPOINT)
             if res.status_code == HTTPStatus.OK:
-                return res.json()
+                return response_json(res)
             else:
                 raise Exception(f"Код {res.status_code} | Text {res.text}")
         except Exception as e:
@@ -1,6 +1,4 @@
 import pytest
-from dotenv import load_dotenv, find_dotenv
-import os
 import logging
 import allure
 from pathlib import Path
@@ -9,6 +7,12 @@ from allure_pytest.listener import AllureListener
 from allure_commons.types import LabelType
 from pytest import Item, FixtureDef, FixtureRequest
 from models.config import ServerEnvs, ClientEnvs
+from utils.envs import load_server_envs, load_client_envs
+from utils.user_pool import UserPool
+from utils.evidence import EvidenceRecorder, EvidencePlugin
+from utils.allure_writer import AllureWriterPlugin
+from utils.transport import TransportPlugin
+from utils.latency_stats import LatencyStatsPlugin
 from faker import Faker
 
 pytest_plugins = [
@@ -28,7 +32,7 @@ class UTF8FileHandler(logging.FileHandler):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, encoding="utf-8", **kwargs)
 
-def pytest_configure():
+def pytest_configure(config: pytest.Config):
     
     folder = Path(__file__).resolve().parent
     
@@ -48,6 +52,16 @@ def pytest_configure():
     file_handler.setFormatter(formatter)
 
     logger.addHandler(file_handler) 
+    
+    # Вложения запросов в allure по режиму --evidence и их запись в фоне
+    config.pluginmanager.register(EvidencePlugin(config), EvidencePlugin.PLUGIN_NAME)
+    config.pluginmanager.register(AllureWriterPlugin(config), AllureWriterPlugin.PLUGIN_NAME)
+    
+    # Общий пул HTTP-соединений для всех клиентов
+    config.pluginmanager.register(TransportPlugin(config), TransportPlugin.PLUGIN_NAME)
+    
+    # Задержки запросов по ручкам со всех воркеров
+    config.pluginmanager.register(LatencyStatsPlugin(config), LatencyStatsPlugin.PLUGIN_NAME)
 
 ################# Allure ####################
 
@@ -157,6 +171,20 @@ def pytest_collection_modifyitems(items):
 def pytest_addoption(parser):
     parser.addoption("--headless", action="store_true", default=False, help="Run tests in headless mode (False if not specified)")
     parser.addoption("--mock", action="store_true", default=False, help="Run GRPC tests with mock data (False if not specified)")
+    parser.addoption("--user-pool", action="store_true", default=False, help="Run each xdist worker under its own test user (False if not specified)")
+    parser.addoption("--no-token-cache", action="store_true", default=False, help="Always request a new OAuth token instead of reusing the on-disk cache (False if not specified)")
+    parser.addoption("--register-concurrency", action="store", type=int, default=8, help="Number of threads for bulk user registration in SOAP fixtures (8 if not specified)")
+    parser.addoption("--evidence", action="store", choices=EvidenceRecorder.MODES, default=EvidenceRecorder.ALWAYS, help="When to attach HTTP, SOAP, SQL and gRPC evidence to allure: always, on-failure or off (always if not specified)")
+    parser.addoption("--evidence-buffer", action="store", type=int, default=200, help="How many last requests of a test are kept for --evidence=on-failure (200 if not specified)")
+    parser.addoption("--attach-max-bytes", action="store", type=int, default=512 * 1024, help="Text evidence attachments above this size keep only head and tail, 0 disables (512 KiB if not specified)")
+    parser.addoption("--attach-gzip-bytes", action="store", type=int, default=0, help="Evidence attachments above this size are stored gzipped, 0 disables (0 if not specified)")
+    parser.addoption("--allure-writer", action="store", choices=["async", "sync"], default="async", help="Write allure-results files from a background thread (async) or from the test thread (sync) (async if not specified)")
+    parser.addoption("--http-pool-size", action="store", type=int, default=32, help="Max keep-alive connections per host in the shared HTTP pool (32 if not specified)")
+    parser.addoption("--http-retries", action="store", type=int, default=2, help="Retries with jittered backoff for idempotent HTTP requests on connection errors and 502/503/504 (2 if not specified)")
+    parser.addoption("--async-concurrency", action="store", type=int, default=32, help="Max concurrent requests of each async API client (32 if not specified)")
+    parser.addoption("--record", action="store", nargs="?", const="cassettes", default=None, metavar="DIR", help="Record HTTP requests of all sessions to cassettes in DIR (cassettes if DIR is not specified)")
+    parser.addoption("--replay", action="store", nargs="?", const="cassettes", default=None, metavar="DIR", help="Serve HTTP requests from cassettes in DIR without network, database cleanup is skipped (cassettes if DIR is not specified)")
+    parser.addoption("--provision", action="store", choices=["api", "db"], default="api", help="Create SOAP mock users through registration (api) or directly in auth and userdata databases (db) (api if not specified)")
     
 @pytest.fixture(scope="session")
 def headless(request: FixtureRequest) -> bool:
@@ -170,29 +198,18 @@ def mock(request: FixtureRequest) -> bool:
 
 @pytest.fixture(scope="session")
 def server_envs() -> ServerEnvs:
-    load_dotenv(find_dotenv("server.env"))
-    envs_instance = ServerEnvs(
-        frontend_url=os.getenv("FRONTEND_URL"),
-        gateway_url=os.getenv("GATEWAY_URL"),
-        auth_url=os.getenv("AUTH_URL"),
-        userdata_url=os.getenv("USERDATA_URL"),
-        spends_db_url=os.getenv("SPENDS_DB_URL"),
-        userdata_db_url=os.getenv("USERDATA_DB_URL"),
-        auth_db_url=os.getenv("AUTH_DB_URL"),
-        kafka_address=os.getenv("KAFKA_ADDRESS"),
-        currency_service_host=os.getenv("CURRENCY_SERVICE_HOST"),
-        wiremock_host=os.getenv("WIREMOCK_HOST")
-    )
+    envs_instance = load_server_envs()
     allure.attach(envs_instance.model_dump_json(indent=2), name="server_envs.json", attachment_type=allure.attachment_type.JSON)
     return envs_instance
 
 @pytest.fixture(scope="session")
-def client_envs() -> ClientEnvs:
-    load_dotenv(find_dotenv("client.env"))
-    envs_instance = ClientEnvs(
-        test_username=os.getenv("TEST_USERNAME"),
-        test_password=os.getenv("TEST_PASSWORD"),
-    )
+def user_pool(request: FixtureRequest) -> UserPool:
+    return UserPool(load_client_envs(), size=UserPool.pool_size(request.config))
+
+@pytest.fixture(scope="session")
+def client_envs(user_pool: UserPool) -> ClientEnvs:
+    """Пользователь, под которым работает текущий воркер"""
+    envs_instance = user_pool.lease()
     allure.attach(envs_instance.model_dump_json(indent=2), name="client_envs.json", attachment_type=allure.attachment_type.JSON)
     return envs_instance
 
@@ -1,12 +1,14 @@
 from typing import Sequence
-from sqlalchemy import create_engine, Engine, event, delete
+from sqlalchemy import create_engine, Engine, event, delete, insert
 from sqlmodel import Session, select
 from models.spend import Spend
 from models.category import Category
 from sqlalchemy.orm import selectinload
+import uuid
 import logging
 import allure
 from models.config import ServerEnvs
+from utils.evidence import evidence
 from models.auth_user import User, Authority
 
 class AuthDb:
@@ -19,9 +21,8 @@ class AuthDb:
         
     @staticmethod
     def attach_sql(cursor, statement, parameters, context):
-        statement_with_params = statement % parameters
         sql_name = statement.split(" ")[0] + " " + context.engine.url.database
-        allure.attach(statement_with_params, name=sql_name, attachment_type=allure.attachment_type.TEXT)
+        evidence.attach(lambda: statement % parameters, name=sql_name, attachment_type=allure.attachment_type.TEXT)
     
     def get_users(self) -> Sequence[User] | None:
         with Session(self.engine) as session:
@@ -64,4 +65,25 @@ class AuthDb:
             session.exec(statement)
             session.commit()
             logging.info(f"Удален пользователь {username} в БД auth")
-            return True
\ No newline at end of file
+            return True
+    
+    def create_users(self, users: list[User], authorities: tuple[str, ...] = ("read", "write")) -> bool:
+        """Создает пользователей с правами одной транзакцией, минуя регистрацию в auth"""
+        with Session(self.engine) as session:
+            session.exec(insert(User), params=[dict(user) for user in users])
+            session.exec(insert(Authority), params=[
+                {"id": str(uuid.uuid4()), "user_id": user.id, "authority": authority}
+                for user in users for authority in authorities
+            ])
+            session.commit()
+            logging.info(f"Создано {len(users)} пользователей в БД auth")
+            return True
+    
+    def delete_users(self, usernames: list[str]) -> bool:
+        with Session(self.engine) as session:
+            user_ids = select(User.id).where(User.username.in_(usernames))
+            session.exec(delete(Authority).where(Authority.user_id.in_(user_ids)), execution_options={"synchronize_session": False})
+            session.exec(delete(User).where(User.username.in_(usernames)), execution_options={"synchronize_session": False})
+            session.commit()
+            logging.info(f"Удалено {len(usernames)} пользователей в БД auth")
+            return True
@@ -7,6 +7,7 @@ from sqlalchemy.orm import selectinload
 import logging
 import allure
 from models.config import ServerEnvs
+from utils.evidence import evidence
 
 class SpendsDb:
     
@@ -18,9 +19,8 @@ class SpendsDb:
         
     @staticmethod
     def attach_sql(cursor, statement, parameters, context):
-        statement_with_params = statement % parameters
         sql_name = statement.split(" ")[0] + " " + context.engine.url.database
-        allure.attach(statement_with_params, name=sql_name, attachment_type=allure.attachment_type.TEXT)
+        evidence.attach(lambda: statement % parameters, name=sql_name, attachment_type=allure.attachment_type.TEXT)
     
     def get_user_spendings(self, username: str) -> Sequence[Spend]:
         with Session(self.engine) as session:
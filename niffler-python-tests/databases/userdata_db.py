@@ -1,11 +1,15 @@
 from typing import Sequence
-from sqlalchemy import create_engine, Engine, event, or_
+from sqlalchemy import create_engine, Engine, event, or_, insert, table, column
 from sqlmodel import Session, select, delete
 import allure
 from models.config import ServerEnvs
+from utils.evidence import evidence
 from models.user import User, Friendship
 import logging
 
+# id в модели Friendship нужен только ORM, в таблице ключ - пара requester_id, addressee_id
+friendship_table = table("friendship", column("requester_id"), column("addressee_id"), column("status"), column("created_date"))
+
 class UserdataDb:
     
     engine: Engine
@@ -16,9 +20,8 @@ class UserdataDb:
         
     @staticmethod
     def attach_sql(cursor, statement, parameters, context):
-        statement_with_params = statement % parameters
         sql_name = statement.split(" ")[0] + " " + context.engine.url.database
-        allure.attach(statement_with_params, name=sql_name, attachment_type=allure.attachment_type.TEXT)
+        evidence.attach(lambda: statement % parameters, name=sql_name, attachment_type=allure.attachment_type.TEXT)
     
     def get_users(self) -> Sequence[User] | None:
         with Session(self.engine) as session:
@@ -65,4 +68,43 @@ class UserdataDb:
             session.delete(user)
             session.commit()
             logging.info(f"Удален пользователь {user.username} в БД userdata")
-            return True
\ No newline at end of file
+            return True
+    
+    def create_users(self, users: list[User], friendships: list[Friendship] = None) -> bool:
+        """Создает пользователей и дружбы одной транзакцией, минуя Kafka и консьюмер userdata"""
+        with Session(self.engine) as session:
+            if users:
+                session.exec(insert(User), params=[dict(user) for user in users])
+            if friendships:
+                session.exec(insert(friendship_table), params=[
+                    friendship.model_dump(exclude={"id", "created_date"}) | {"created_date": friendship.created_date}
+                    for friendship in friendships
+                ])
+            session.commit()
+            logging.info(f"Создано {len(users)} пользователей и {len(friendships or [])} дружб в БД userdata")
+            return True
+    
+    def add_friendships(self, friendships: list[Friendship]) -> bool:
+        return self.create_users([], friendships)
+    
+    def get_users_by_names(self, usernames: list[str]) -> Sequence[User]:
+        with Session(self.engine) as session:
+            statement = select(User).where(User.username.in_(usernames))
+            users = session.exec(statement).all()
+            logging.info(f"Получено {len(users)} пользователей по именам")
+            return users
+    
+    def delete_users(self, usernames: list[str]) -> bool:
+        with Session(self.engine) as session:
+            # Удаление по подзапросу: ORM не синхронизирует сессию, иначе запросит RETURNING id
+            user_ids = select(User.id).where(User.username.in_(usernames))
+            session.exec(delete(Friendship).where(
+                or_(
+                    Friendship.addressee_id.in_(user_ids),
+                    Friendship.requester_id.in_(user_ids)
+                )
+            ), execution_options={"synchronize_session": False})
+            session.exec(delete(User).where(User.username.in_(usernames)), execution_options={"synchronize_session": False})
+            session.commit()
+            logging.info(f"Удалено {len(usernames)} пользователей в БД userdata")
+            return True
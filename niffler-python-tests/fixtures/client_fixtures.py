@@ -1,8 +1,13 @@
 import pytest
+import asyncio
 from models.config import ServerEnvs, ClientEnvs
 from clients.oauth_client import OAuthClient
 from clients.spends_client import SpendsClient
 from clients.users_client import UsersClient
+from clients.async_spends_client import AsyncSpendsClient
+from clients.async_users_client import AsyncUsersClient
+from utils.transport import transport
+from utils.cassette import OfflineDb
 from clients.soap_client import SoapClient
 from clients.kafka_client import KafkaClient
 from databases.spends_db import SpendsDb
@@ -47,6 +52,37 @@ def soap_client(server_envs: ServerEnvs, client_envs: ClientEnvs):
     yield soap_client
     soap_client.close()
 
+################# Async API ####################
+
+@pytest.fixture(scope="session")
+def async_runner():
+    """Цикл событий на всю сессию: синхронные тесты и фикстуры выполняют в нем корутины
+    async-клиентов через async_runner.run(...), соединения пула живут между вызовами"""
+    with asyncio.Runner() as runner:
+        yield runner
+        runner.run(transport.aclose())
+
+@pytest.fixture(scope="session")
+def async_spends_client(async_runner: asyncio.Runner, server_envs: ServerEnvs, client_envs: ClientEnvs, token_data: TokenData, request):
+    async_spends_client: AsyncSpendsClient = AsyncSpendsClient(
+        server_envs=server_envs,
+        client_envs=client_envs,
+        token=token_data.access_token,
+        concurrency=request.config.getoption("--async-concurrency")
+    )
+    yield async_spends_client
+    async_runner.run(async_spends_client.close())
+
+@pytest.fixture(scope="session")
+def async_users_client(async_runner: asyncio.Runner, server_envs: ServerEnvs, token_data: TokenData, request):
+    async_users_client: AsyncUsersClient = AsyncUsersClient(
+        server_envs=server_envs,
+        token=token_data.access_token,
+        concurrency=request.config.getoption("--async-concurrency")
+    )
+    yield async_users_client
+    async_runner.run(async_users_client.close())
+
 ################# Kafka ####################
 
 @pytest.fixture(scope="session")
@@ -67,14 +103,18 @@ def grpc_client(server_envs: ServerEnvs, mock: bool) -> NifflerCurrencyServiceCl
 
 ################# Database ####################
 
+def offline_if_replay(request, db):
+    """С --replay стенда нет: очистка БД пропускается, тесты с запросами к БД пропускаются"""
+    return OfflineDb(db) if request.config.getoption("--replay") else db
+
 @pytest.fixture(scope="session")
-def spends_db(server_envs: ServerEnvs) -> SpendsDb:
-    return SpendsDb(server_envs=server_envs)
+def spends_db(server_envs: ServerEnvs, request) -> SpendsDb:
+    return offline_if_replay(request, SpendsDb(server_envs=server_envs))
 
 @pytest.fixture(scope="session")
-def userdata_db(server_envs: ServerEnvs) -> UserdataDb:
-    return UserdataDb(server_envs=server_envs)
+def userdata_db(server_envs: ServerEnvs, request) -> UserdataDb:
+    return offline_if_replay(request, UserdataDb(server_envs=server_envs))
 
 @pytest.fixture(scope="session")
-def auth_db(server_envs: ServerEnvs) -> AuthDb:
-    return AuthDb(server_envs=server_envs)
\ No newline at end of file
+def auth_db(server_envs: ServerEnvs, request) -> AuthDb:
+    return offline_if_replay(request, AuthDb(server_envs=server_envs))
\ No newline at end of file
@@ -1,19 +1,76 @@
 import pytest
 import logging
+from pytest import FixtureRequest
 from clients.lock_client import LockManager
 from databases.spends_db import SpendsDb
 from databases.auth_db import AuthDb
 from databases.userdata_db import UserdataDb
 from models.config import ClientEnvs
-from clients.lock_client import LockManager
 from clients.oauth_client import OAuthClient
 from models.auth_user import TokenData
 from models.spend import SpendGet
 from clients.spends_client import SpendsClient
+from utils.envs import load_server_envs, load_client_envs
+from utils.session_broker import SessionBroker
+from utils.user_pool import UserPool
+from utils.lock_stats import LockStatsPlugin
+from utils.token_cache import TokenCache
+
+def clear_stand(
+    spends_db: SpendsDb, auth_db: AuthDb, userdata_db: UserdataDb, 
+    client_envs: ClientEnvs, keep_users: list[str] = None
+):
+    from utils.cleaner import StandCleaner
+    stand_cleaner = StandCleaner(
+        spends_db,
+        auth_db,
+        userdata_db,
+        client_envs,
+        keep_users
+    )
+    stand_cleaner.clean()
+    logging.info("Очистка стенда завершена")
+
+def get_token_cache(config: pytest.Config) -> TokenCache | None:
+    """Кэш токенов на диске, с --no-token-cache токен всегда получается заново"""
+    if config.getoption("--no-token-cache"):
+        return None
+    return TokenCache()
+
+def get_token_data(auth_client: OAuthClient, client_envs: ClientEnvs, token_cache: TokenCache = None) -> dict:
+    username = client_envs.test_username
+    password = client_envs.test_password
+    token_data = auth_client.get_cached_token(username, password, token_cache)
+    return token_data.model_dump()
+
+################# Xdist session broker ####################
+
+def _broker_clear_stand(config: pytest.Config):
+    if config.getoption("--replay"):
+        logging.info("Очистка стенда пропущена: запросы воспроизводятся из кассет")
+        return
+    user_pool = UserPool(load_client_envs(), size=UserPool.pool_size(config))
+    server_envs = load_server_envs()
+    clear_stand(
+        SpendsDb(server_envs), AuthDb(server_envs), UserdataDb(server_envs), 
+        user_pool.client_envs, keep_users=user_pool.usernames
+    )
+
+def _broker_token_data(config: pytest.Config) -> dict:
+    user_pool = UserPool(load_client_envs(), size=UserPool.pool_size(config))
+    return user_pool.provision(load_server_envs(), get_token_cache(config))
+
+def pytest_configure(config: pytest.Config):
+    """Ресурсы, которые при запуске через xdist создает контроллер, а не воркеры, и сбор статистики блокировок"""
+    broker = SessionBroker(config)
+    broker.register("cleanup", create_func=lambda: _broker_clear_stand(config))
+    broker.register("token_data", create_func=lambda: _broker_token_data(config))
+    config.pluginmanager.register(broker, SessionBroker.PLUGIN_NAME)
+    config.pluginmanager.register(LockStatsPlugin(config), LockStatsPlugin.PLUGIN_NAME)
 
 @pytest.fixture(scope="session")
-def lock_manager() -> LockManager:
-    return LockManager()
+def lock_manager(request: FixtureRequest) -> LockManager:
+    return LockManager(broker=request.config.pluginmanager.get_plugin(SessionBroker.PLUGIN_NAME))
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -22,50 +79,39 @@ def cleanup(
     spends_db: SpendsDb,
     auth_db: AuthDb,
     userdata_db: UserdataDb,
-    client_envs: ClientEnvs
+    client_envs: ClientEnvs,
+    user_pool: UserPool
 ):
     
-    def clear_stand():
-        from utils.cleaner import StandCleaner
-        stand_cleaner = StandCleaner(
-            spends_db,
-            auth_db,
-            userdata_db,
-            client_envs
-        )
-        stand_cleaner.clean()
-        logging.info("Очистка стенда завершена")
+    def clear_stand_func():
+        clear_stand(spends_db, auth_db, userdata_db, client_envs, keep_users=user_pool.usernames)
     
     logging.info("Очистка стенда перед началом тестов")
     
     for users in lock_manager.acquire_lock(
         lock_file_path="cleanup.lock",
         lock_count_path="cleanup.count",
-        create_func=clear_stand,
-        cleanup_func=clear_stand,
+        create_func=clear_stand_func,
+        cleanup_func=clear_stand_func,
         name="cleanup"
     ):
         yield users
         
 @pytest.fixture(scope="session", autouse=True)
 def token_data(
-    client_envs: ClientEnvs, auth_client: OAuthClient, cleanup, lock_manager: LockManager
+    request: FixtureRequest, client_envs: ClientEnvs, auth_client: OAuthClient, cleanup, lock_manager: LockManager
 ):
+    """Токен пользователя воркера. Данные хранятся по username, чтобы контроллер xdist мог выдать токены всему пулу"""
+    username = client_envs.test_username
     
-    def get_token_data():
-        username = client_envs.test_username
-        password = client_envs.test_password
-        auth_client.register(username, password)
-        token_data = auth_client.get_token(username, password)
-        return token_data.model_dump()
-    
-    for token_data in lock_manager.acquire_lock(
-        lock_file_path="token_data.lock",
-        lock_data_path="token_data.json",
-        lock_count_path="token_data.count",
+    for tokens in lock_manager.acquire_lock(
+        lock_file_path=f"token_data_{username}.lock",
+        lock_data_path=f"token_data_{username}.json",
+        lock_count_path=f"token_data_{username}.count",
         name="token_data",
-        create_func=get_token_data
+        create_func=lambda: {username: get_token_data(auth_client, client_envs, get_token_cache(request.config))}
     ):
+        token_data = tokens[username]
         yield TokenData(
             access_token=token_data["access_token"],
             code_verifier=token_data["code_verifier"],
@@ -76,37 +122,55 @@ def token_data(
 
 @pytest.fixture
 def spendings_list(
-    spends_client: SpendsClient, lock_manager: LockManager
+    request: FixtureRequest, spends_client: SpendsClient, lock_manager: LockManager, client_envs: ClientEnvs
 ):
+    """Список трат пользователя.
+    
+    Читающие тесты держат общую блокировку трат и выполняются параллельно.
+    Тесты с delete_spendings_lock изменяют траты, поэтому получают ее монопольно.
+    """
     # Без блокировки иногда падает ui тест для удаления трат, потому что выбирает не тот индекс
     def get_spendings():
         return [s.model_dump() for s in spends_client.get_all_spendings()]
     
-    for spendings_list in lock_manager.acquire_lock(
-        lock_file_path="spendings_list.lock",
-        lock_data_path="spendings_list.json",
-        lock_count_path="spendings_list.count",
-        name="spendings_list",
-        create_func=get_spendings
-    ):
-        yield [SpendGet.model_validate(s) for s in spendings_list]
+    if "delete_spendings_lock" in request.fixturenames:
+        # Монопольная блокировка должна быть взята до снимка трат, общая тесту уже не нужна
+        request.getfixturevalue("delete_spendings_lock")
+        read_lock = iter([None])
+    else:
+        read_lock = lock_manager.acquire_lock(
+            lock_file_path=f"delete_spendings_{client_envs.test_username}.lock",
+            name="spendings_read",
+            shared=True
+        )
+    
+    for _ in read_lock:
+        for spendings_list in lock_manager.acquire_lock(
+            lock_file_path=f"spendings_list_{client_envs.test_username}.lock",
+            lock_data_path=f"spendings_list_{client_envs.test_username}.json",
+            lock_count_path=f"spendings_list_{client_envs.test_username}.count",
+            name="spendings_list",
+            create_func=get_spendings
+        ):
+            yield [SpendGet.model_validate(s) for s in spendings_list]
 
 @pytest.fixture(scope="function")
-def delete_spendings_lock(lock_manager: LockManager):
-    """Фикстура для блокировки тестов удаления расходов"""
+def delete_spendings_lock(lock_manager: LockManager, client_envs: ClientEnvs):
+    """Фикстура для монопольной блокировки трат в тестах, которые их изменяют или удаляют.
+    Блокировка своя у каждого пользователя, поэтому с --user-pool воркеры не ждут друг друга"""
     
     for _ in lock_manager.acquire_lock(
-        lock_file_path="delete_spendings.lock",
+        lock_file_path=f"delete_spendings_{client_envs.test_username}.lock",
         name="delete_spendings"
     ):
         yield
 
 @pytest.fixture(scope="function")
-def profile_name_lock(lock_manager: LockManager):
+def profile_name_lock(lock_manager: LockManager, client_envs: ClientEnvs):
     """Фикстура для блокировки тестов изменения имени в профиле"""
     
     for _ in lock_manager.acquire_lock(
-        lock_file_path="profile_name.lock",
+        lock_file_path=f"profile_name_{client_envs.test_username}.lock",
         name="profile_name"
     ):
         yield
\ No newline at end of file
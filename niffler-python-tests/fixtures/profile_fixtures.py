@@ -1,6 +1,5 @@
 import pytest
 from models.config import ClientEnvs
-from models.category import Category
 from clients.spends_client import SpendsClient
 from databases.spends_db import SpendsDb
 import logging
@@ -18,11 +17,12 @@ def all_categories(spends_client: SpendsClient):
     return spends_client.get_all_categories()
 
 @pytest.fixture(scope="function")
-def new_category(request: FixtureRequest, spends_db: SpendsDb):
+def new_category(request: FixtureRequest, spends_client: SpendsClient, spends_db: SpendsDb):
     """Только удаляет категорию, не добавляет"""
     category_name = request.param
     yield category_name
     spends_db.delete_category_by_name(category_name)
+    spends_client.invalidate_categories()
 
 @pytest.fixture(scope="function")
 def category(request: FixtureRequest, spends_client: SpendsClient, spends_db: SpendsDb):
@@ -30,17 +30,19 @@ def category(request: FixtureRequest, spends_client: SpendsClient, spends_db: Sp
     category_data = spends_client.add_category(category_name)
     yield category_name
     spends_db.delete_category(category_data.id)
+    spends_client.invalidate_categories(category_data.id)
     
 @pytest.fixture(scope="function")
-def archived_category(request: FixtureRequest, spends_client: SpendsClient, all_categories: list[Category], spends_db: SpendsDb):
+def archived_category(request: FixtureRequest, spends_client: SpendsClient, spends_db: SpendsDb):
     category_name = request.param
-    active_category = next((c for c in all_categories if c.name == category_name and c.archived == False), None)
-    if not active_category:
+    active_category = spends_client.get_category_by_name(category_name)
+    if not active_category or active_category.archived:
         active_category = spends_client.add_category(category_name)
     active_category.archived = True
     spends_client.update_category(active_category)
     yield category_name
     spends_db.delete_category(active_category.id)
+    spends_client.invalidate_categories(active_category.id)
     
 @pytest.fixture(scope="function")
 def new_archived_categories(spends_client: SpendsClient, spends_db: SpendsDb):
@@ -54,6 +56,7 @@ def new_archived_categories(spends_client: SpendsClient, spends_db: SpendsDb):
     yield archived_categories
     for cat_id in categories:
         spends_db.delete_category(cat_id)
+        spends_client.invalidate_categories(cat_id)
 
 @pytest.fixture(scope="class")
 def mixed_categories(spends_client: SpendsClient, spends_db: SpendsDb):
@@ -74,4 +77,5 @@ def mixed_categories(spends_client: SpendsClient, spends_db: SpendsDb):
     logging.info(f"Active categories: {categories['active']}, archived categories: {categories['archived']}")
     yield categories
     for cat_id in categories["active"]+categories["archived"]:
-        spends_db.delete_category(cat_id)
\ No newline at end of file
+        spends_db.delete_category(cat_id)
+        spends_client.invalidate_categories(cat_id)
\ No newline at end of file
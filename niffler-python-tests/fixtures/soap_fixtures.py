@@ -1,6 +1,7 @@
 import logging
 import pytest
-from utils.user_creator import SoapUserCreator
+from utils.user_creator import SoapUserCreator, DbUserCreator
+from utils.friendship_graph import FriendshipGraphBuilder, FriendshipSpec, FriendshipGraph
 from clients.oauth_client import OAuthClient
 from clients.soap_client import SoapClient
 from databases.userdata_db import UserdataDb
@@ -9,6 +10,7 @@ from faker import Faker
 
 @pytest.fixture(scope="session")
 def soap_user_creator(
+    request: pytest.FixtureRequest,
     auth_client: OAuthClient,
     soap_client: SoapClient,
     userdata_db: UserdataDb,
@@ -20,7 +22,9 @@ def soap_user_creator(
         soap_client,
         userdata_db,
         auth_db,
-        faker
+        faker,
+        concurrency=request.config.getoption("--register-concurrency"),
+        db_user_creator=DbUserCreator(auth_db, userdata_db) if request.config.getoption("--provision") == "db" else None
     )
 
 @pytest.fixture(scope="function")
@@ -50,4 +54,20 @@ def mock_friends_actions(
     logging.info("Создание mock-пользователей (actions) для SOAP перед началом тестов")
     users = soap_user_creator.create_users(10, actions_user=soap_actions_user)
     yield users
-    soap_user_creator.delete_users(users)
\ No newline at end of file
+    soap_user_creator.delete_users(users)
+
+@pytest.fixture(scope="function")
+def friendship_graph(soap_user_creator: SoapUserCreator):
+    """Фабрика графов связей: friendship_graph(FriendshipSpec(owner=..., friends=500, incoming=30, outgoing=20)).
+    Созданные пользователи удаляются после теста"""
+    builder = FriendshipGraphBuilder(soap_user_creator)
+    graphs: list[FriendshipGraph] = []
+    
+    def build(spec: FriendshipSpec) -> FriendshipGraph:
+        graph = builder.build(spec)
+        graphs.append(graph)
+        return graph
+    
+    yield build
+    for graph in graphs:
+        builder.destroy(graph)
@@ -39,16 +39,7 @@ def spendings_data(client_envs: ClientEnvs, faker: Faker):
 
 @pytest.fixture(scope="class")
 def add_spendings(spends_client: SpendsClient, spendings_data: list[SpendAdd]):
-    all_spendings = spends_client.get_all_spendings()
-    for data in spendings_data:
-        amount = data.amount
-        category = data.category.name
-        currency = data.currency
-        description = data.description
-        if any([amount in [s.amount for s in all_spendings], 
-                category in [s.category.name for s in all_spendings], 
-                currency in [s.currency for s in all_spendings], 
-                description in [s.description for s in all_spendings]]):
-            continue
-        spends_client.add_spending(data)
+    results = spends_client.add_spendings_bulk(spendings_data)
+    errors = [f"{r.data.description}: {r.error}" for r in results if r.error]
+    assert not errors, f"Не удалось добавить траты: {errors}"
     yield
\ No newline at end of file
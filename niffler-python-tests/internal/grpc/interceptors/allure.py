@@ -3,6 +3,7 @@ import allure
 from typing import Callable
 from google.protobuf.message import Message
 from google.protobuf.json_format import MessageToJson
+from utils.evidence import evidence
 
 
 class AllureInterceptor(grpc.UnaryUnaryClientInterceptor):
@@ -12,15 +13,17 @@ class AllureInterceptor(grpc.UnaryUnaryClientInterceptor):
         client_call_details: grpc.ClientCallDetails, request: Message
     ) -> Callable:
         with allure.step(client_call_details.method):
-            allure.attach(
-                body=MessageToJson(request),
+            evidence.attach(
+                body=lambda: MessageToJson(request),
                 name="Request",
-                attachment_type=allure.attachment_type.JSON
+                attachment_type=allure.attachment_type.JSON,
+                step=client_call_details.method
             )
             response = continuation(client_call_details, request)
-            allure.attach(
-                body=MessageToJson(response.result()),
+            evidence.attach(
+                body=lambda: MessageToJson(response.result()),
                 name="Response",
-                attachment_type=allure.attachment_type.JSON
+                attachment_type=allure.attachment_type.JSON,
+                step=client_call_details.method
             )
             return response
\ No newline at end of file
@@ -0,0 +1,111 @@
+import json
+import time
+import argparse
+import curlify
+import httpx
+import requests
+from typing import Callable
+from clients.spends_client import SPENDS_ADAPTER
+from models.spend import SpendGet
+from utils.json_codec import dumps_pretty, response_json
+from utils.allure_helpers import RequestSnapshot, get_template, render_request
+
+REPORT_TEMPLATE = "http-colored-request.ftl"
+
+
+def measure(func: Callable[[], object], iterations: int, repeats: int = 5) -> float:
+    """Лучшее из repeats среднее время вызова func в миллисекундах.
+    Минимум меньше всего зависит от фоновой нагрузки машины"""
+    func()
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        best = min(best, (time.perf_counter() - started) / iterations)
+    return best * 1000
+
+
+def template_benchmark(iterations: int = 2000) -> dict[str, float]:
+    """Отчет о запросе для allure: шаблон, загружаемый на каждый запрос, против скомпилированного один раз"""
+    request = requests.Request(
+        "POST",
+        "http://gateway.niffler.dc:8090/api/spends/add",
+        json={"amount": 1500.25, "description": "Бенчмарк", "currency": "RUB", "spendDate": "2024-01-15T10:30:00.000Z"},
+        headers={"Authorization": "Bearer token", "Accept": "application/json"}
+    ).prepare()
+
+    def before():
+        snapshot = RequestSnapshot.from_request(request)
+        get_template.__wrapped__(REPORT_TEMPLATE).render(request=snapshot, curl=curlify.to_curl(snapshot))
+
+    return {
+        "before": measure(before, max(iterations // 20, 1)),
+        "after": measure(lambda: render_request(request), iterations)
+    }
+
+
+def spends_page(items: int) -> bytes:
+    return json.dumps({
+        "content": [
+            {
+                "id": f"{number:08d}-0000-0000-0000-000000000000",
+                "amount": 100 + number,
+                "description": f"Трата {number}",
+                "category": {"id": f"{number % 10:08d}-0000-0000-0000-000000000000", "name": f"Категория {number % 10}", "username": "duck", "archived": False},
+                "spendDate": "2024-01-15T10:30:00.000+00:00",
+                "currency": "RUB",
+                "username": "duck"
+            }
+            for number in range(items)
+        ],
+        "number": 0,
+        "size": items,
+        "last": True
+    }).encode("utf-8")
+
+
+def json_benchmark(iterations: int = 2000, items: int = 1000) -> dict[str, float]:
+    """Страница трат: разбор клиентом и вложением allure по отдельности с валидацией каждой траты
+    против одного разбора на ответ и валидации страницы одним TypeAdapter"""
+    content = spends_page(items)
+    iterations = max(iterations // 100, 1)
+
+    def before():
+        response = httpx.Response(200, content=content)
+        [SpendGet.model_validate(item) for item in response.json()["content"]]
+        json.dumps(response.json(), indent=4).encode("utf-8")
+
+    def after():
+        response = httpx.Response(200, content=content)
+        SPENDS_ADAPTER.validate_python(response_json(response)["content"])
+        dumps_pretty(response_json(response))
+
+    return {
+        "before": measure(before, iterations),
+        "after": measure(after, iterations)
+    }
+
+
+BENCHMARKS: dict[str, Callable[[int], dict[str, float]]] = {
+    "template": template_benchmark,
+    "json": json_benchmark
+}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m perf.benchmarks", description="Micro-benchmarks of the test framework hot paths")
+    parser.add_argument("names", nargs="*", metavar="NAME", help=f"Benchmarks to run: {', '.join(BENCHMARKS)} (all if not specified)")
+    parser.add_argument("--iterations", type=int, default=2000, help="Calls per measurement of the fast variant (2000 if not specified)")
+    args = parser.parse_args(argv)
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+    for name in args.names or BENCHMARKS:
+        results = BENCHMARKS[name](args.iterations)
+        print(f"{name}: " + ", ".join(f"{variant} {value:.3f} ms" for variant, value in results.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,113 @@
+import os
+import json
+import signal
+import argparse
+from pathlib import Path
+from perf.config import LoadConfig, DEFAULT_JOURNEYS
+from perf.coordinator import Coordinator, is_loopback, parse_address, run_worker
+from perf.engine import LOGS_DIR, LoadEngine, setup_process
+from perf.journeys import JOURNEYS
+from perf.report import summarize, format_table
+from utils.envs import load_server_envs
+from utils.latency_stats import latency_stats
+
+def parse_journeys(value: str) -> dict[str, float]:
+    """add=3,list=5 -> {"add": 3.0, "list": 5.0}; сценарий без веса получает вес 1"""
+    journeys = {}
+    for part in filter(None, (part.strip() for part in value.split(","))):
+        name, _, weight = part.partition("=")
+        try:
+            journeys[name] = float(weight) if weight else 1.0
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Некорректный вес сценария: {part}")
+    return journeys
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="niffler-load",
+        description="Load test of the Niffler stand with the API clients of the test project (server.env)"
+    )
+    parser.add_argument("--users", type=int, default=10, help="Number of virtual users (10 if not specified)")
+    parser.add_argument("--rate", type=float, default=None, help="Journey starts per second, open model (closed model with --users if not specified)")
+    parser.add_argument("--ramp-up", type=float, default=0, help="Seconds to linearly reach --users or --rate (0 if not specified)")
+    parser.add_argument("--duration", type=float, default=60, help="Test duration in seconds (60 if not specified)")
+    parser.add_argument("--think-time", type=float, default=0, help="Pause of a virtual user between journeys in seconds (0 if not specified)")
+    parser.add_argument(
+        "--journeys", type=parse_journeys, default=dict(DEFAULT_JOURNEYS),
+        help=f"Weighted journeys name=weight,... from {', '.join(JOURNEYS)} "
+             f"({','.join(f'{name}={weight}' for name, weight in DEFAULT_JOURNEYS.items())} if not specified)"
+    )
+    parser.add_argument("--user-prefix", default="load", help="Prefix of virtual user names, users are registered if missing (load if not specified)")
+    parser.add_argument("--password", default="load12345", help="Password of virtual users (load12345 if not specified)")
+    parser.add_argument("--grpc", action="store_true", default=False, help="Enable the gRPC currencies journey (False if not specified)")
+    parser.add_argument("--http-pool-size", type=int, default=None, help="Max keep-alive connections per host (--users if not specified)")
+    parser.add_argument("--report", type=Path, default=LOGS_DIR / "load_report.json", help="JSON report path (logs/load_report.json if not specified)")
+    parser.add_argument("--log-level", default="WARNING", help="Level of logs/load.log (WARNING if not specified)")
+    parser.add_argument("--workers", type=int, default=1, help="Local worker processes sharing --users and --rate, 1 runs in this process (1 if not specified)")
+    parser.add_argument("--remote-workers", type=int, default=0, help="Workers from other hosts to wait for on --listen, requires NIFFLER_LOAD_AUTHKEY (0 if not specified)")
+    parser.add_argument("--listen", type=parse_address, default=("127.0.0.1", 0), metavar="HOST:PORT", help="Coordinator address for workers, non-loopback requires NIFFLER_LOAD_AUTHKEY (127.0.0.1 and a free port if not specified)")
+    parser.add_argument("--connect", type=parse_address, default=None, metavar="HOST:PORT", help="Run as a worker of the coordinator at HOST:PORT (coordinator mode if not specified)")
+    parser.add_argument("--stats-interval", type=float, default=5, help="Seconds between live aggregated stats lines (5 if not specified)")
+    return parser
+
+
+def config_from_args(args: argparse.Namespace) -> LoadConfig:
+    journeys = dict(args.journeys)
+    if args.grpc:
+        journeys.setdefault("currencies", 1.0)
+    return LoadConfig(
+        users=args.users,
+        rate=args.rate,
+        ramp_up=args.ramp_up,
+        duration=args.duration,
+        think_time=args.think_time,
+        journeys=journeys,
+        user_prefix=args.user_prefix,
+        password=args.password,
+        grpc=args.grpc
+    )
+
+
+def print_report(report: dict):
+    print(f"\nДлительность {report['elapsed']}s, пропущено запусков {report['dropped']}")
+    for title, name, column in (("Операции", "operations", "operation"), ("Ручки", "endpoints", "endpoint")):
+        print(f"\n{title}:")
+        for line in format_table(report[name], column):
+            print(line)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    # Ключ канала воркеров: без него по сети нельзя, локальным процессам координатор создает случайный
+    authkey = os.getenv("NIFFLER_LOAD_AUTHKEY", "").encode("utf-8") or None
+    if authkey is None and (args.connect or args.remote_workers or not is_loopback(args.listen[0])):
+        parser.error("--connect, --remote-workers and a non-loopback --listen require NIFFLER_LOAD_AUTHKEY")
+    if args.connect:
+        run_worker(args.connect, authkey)
+        return 0
+
+    config = config_from_args(args)
+    print(f"niffler-load: {config.users} пользователей, {config.duration}s, сценарии {config.journeys}")
+    if args.workers > 1 or args.remote_workers:
+        coordinator = Coordinator(
+            config, load_server_envs(), workers=args.workers, remote_workers=args.remote_workers,
+            address=args.listen, authkey=authkey, pool_size=args.http_pool_size,
+            log_level=args.log_level, interval=args.stats_interval
+        )
+        signal.signal(signal.SIGINT, lambda *_: coordinator.stop())
+        report = coordinator.run()
+    else:
+        setup_process(config, args.http_pool_size, args.log_level)
+        engine = LoadEngine(config, load_server_envs())
+        signal.signal(signal.SIGINT, lambda *_: engine.stop())
+        engine.run()
+        report = summarize([engine.stats.dump()], [latency_stats.dump()], engine.elapsed, engine.dropped)
+
+    args.report.parent.mkdir(parents=True, exist_ok=True)
+    args.report.write_text(json.dumps(report, ensure_ascii=False, indent=4), encoding="utf-8")
+    print_report(report)
+    print(f"\nОтчет: {args.report}")
+    operations = report["operations"].values()
+    return 1 if any(row["errors"] for row in operations) else 0
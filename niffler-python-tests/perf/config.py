@@ -0,0 +1,50 @@
+import math
+from pydantic import BaseModel, Field
+
+# Доли сценариев по умолчанию: чтение чаще записи, как у живых пользователей
+DEFAULT_JOURNEYS = {
+    "login": 1,
+    "add": 3,
+    "list": 5,
+    "search": 2,
+    "edit": 2,
+    "delete": 1,
+    "friends": 1
+}
+
+
+class LoadConfig(BaseModel):
+    """Параметры нагрузки.
+
+    Без rate нагрузка закрытая: users виртуальных пользователей выполняют сценарии друг за другом.
+    С rate - открытая: сценарии запускаются с частотой rate в секунду свободными пользователями,
+    а запуски, для которых свободного пользователя нет, считаются пропущенными.
+    Пользователи и частота выходят на заданное значение линейно за ramp_up секунд.
+    """
+
+    users: int = Field(default=10, ge=1)
+    rate: float | None = Field(default=None, gt=0)
+    ramp_up: float = Field(default=0, ge=0)
+    duration: float = Field(default=60, gt=0)
+    think_time: float = Field(default=0, ge=0)
+    journeys: dict[str, float] = Field(default_factory=lambda: dict(DEFAULT_JOURNEYS))
+    user_prefix: str = "load"
+    password: str = "load12345"
+    grpc: bool = False
+    first_user: int = 0
+
+    def usernames(self) -> list[str]:
+        return [f"{self.user_prefix}_{number}" for number in range(self.first_user, self.first_user + self.users)]
+
+    def arrival_time(self, number: int) -> float:
+        """Время запуска number от начала нагрузки по накопленному числу запусков.
+
+        За разгон частота растет как rate * t / ramp_up, значит к моменту t запусков
+        rate * t^2 / (2 * ramp_up), и запуск n приходится на sqrt(2 * n * ramp_up / rate).
+        После разгона запуски идут равномерно с частотой rate.
+        """
+        rate, ramp_up = self.rate, self.ramp_up
+        ramp_arrivals = rate * ramp_up / 2
+        if number < ramp_arrivals:
+            return math.sqrt(2 * number * ramp_up / rate)
+        return ramp_up + (number - ramp_arrivals) / rate
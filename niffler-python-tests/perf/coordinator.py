@@ -0,0 +1,228 @@
+import time
+import signal
+import secrets
+import ipaddress
+import logging
+import threading
+import multiprocessing
+from typing import Callable
+from multiprocessing.connection import Client, Connection, Listener, wait
+from models.config import ServerEnvs
+from perf.config import LoadConfig
+from perf.engine import LoadEngine, setup_process
+from perf.report import summarize
+from utils.histogram import Histogram
+from utils.latency_stats import LatencyStats, latency_stats
+
+
+def parse_address(value: str) -> tuple[str, int]:
+    host, _, port = value.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def split_config(config: LoadConfig, workers: int) -> list[LoadConfig]:
+    """Делит пользователей между воркерами без пересечений, частоту - пропорционально пользователям"""
+    if config.users < workers:
+        raise ValueError(f"Пользователей ({config.users}) меньше, чем воркеров ({workers})")
+    share, rest = divmod(config.users, workers)
+    parts, first_user = [], config.first_user
+    for number in range(workers):
+        users = share + (number < rest)
+        rate = config.rate * users / config.users if config.rate else None
+        parts.append(config.model_copy(update={"users": users, "rate": rate, "first_user": first_user}))
+        first_user += users
+    return parts
+
+
+def run_worker(address: tuple[str, int], authkey: bytes):
+    """Процесс нагрузки: получает от координатора настройки, отправляет ему накопленные замеры
+    каждые interval секунд и последний раз - после окончания. Остановить его может только координатор"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    conn = Client(address, authkey=authkey)
+    task = conn.recv()
+    if task.get("type") == "stop":
+        return
+    config = LoadConfig.model_validate(task["config"])
+    setup_process(config, task["pool_size"], task["log_level"], f"load_{task['worker']}.log")
+    engine = LoadEngine(config, ServerEnvs.model_validate(task["server_envs"]))
+
+    def listen():
+        try:
+            while conn.recv().get("type") != "stop":
+                pass
+        except (EOFError, OSError):
+            pass
+        engine.stop()
+
+    threading.Thread(target=listen, name="coordinator", daemon=True).start()
+    runner = threading.Thread(target=engine.run, name="engine")
+    runner.start()
+    while True:
+        runner.join(task["interval"])
+        final = not runner.is_alive()
+        conn.send(_snapshot(task["worker"], engine, final))
+        if final:
+            break
+    conn.close()
+
+
+def _snapshot(worker: int, engine: LoadEngine, final: bool) -> dict:
+    return {
+        "type": "stats",
+        "worker": worker,
+        "final": final,
+        "elapsed": engine.elapsed,
+        "active": engine.active,
+        "dropped": engine.dropped,
+        "operations": engine.stats.dump(),
+        "endpoints": latency_stats.dump()
+    }
+
+
+class Coordinator:
+    """Распределяет нагрузку по процессам и собирает их замеры.
+
+    Координатор слушает TCP-адрес, запускает workers локальных процессов и ждет еще
+    remote_workers процессов с других машин (python -m perf --connect host:port).
+    Каждый воркер получает свою часть пользователей и частоты, адреса стенда и выполняет
+    LoadEngine. Воркеры присылают накопленные дампы гистограмм, координатор складывает их:
+    корзины одинаковой точности суммируются, поэтому перцентили те же, что у одного процесса.
+
+    Канал передает pickle и адреса стенда с паролями БД: кто знает ключ, тот получает их
+    и может выполнить код в координаторе. Поэтому для удаленных воркеров и адреса не на loopback
+    ключ обязателен, а для локальных процессов без ключа генерируется случайный.
+    """
+
+    def __init__(
+        self, config: LoadConfig, server_envs: ServerEnvs, workers: int, remote_workers: int = 0,
+        address: tuple[str, int] = ("127.0.0.1", 0), authkey: bytes | None = None,
+        pool_size: int | None = None, log_level: str = "WARNING", interval: float = 5,
+        connect_timeout: float = 60, output: Callable[[str], None] = print
+    ):
+        if authkey is None:
+            if remote_workers or not is_loopback(address[0]):
+                raise ValueError("Для удаленных воркеров и адреса не на loopback нужен ключ NIFFLER_LOAD_AUTHKEY")
+            authkey = secrets.token_bytes(32)
+        self.config = config
+        self.server_envs = server_envs
+        self.workers = workers
+        self.remote_workers = remote_workers
+        self.address = address
+        self.authkey = authkey
+        self.pool_size = pool_size
+        self.log_level = log_level
+        self.interval = interval
+        self.connect_timeout = connect_timeout
+        self.output = output
+        self.snapshots: dict[int, dict] = {}
+        self._connections: list[Connection] = []
+
+    def stop(self):
+        """Просит воркеры закончить: они досылают итоговые замеры и выходят"""
+        for conn in list(self._connections):
+            try:
+                conn.send({"type": "stop"})
+            except OSError:
+                pass
+
+    def run(self) -> dict:
+        total = self.workers + self.remote_workers
+        parts = split_config(self.config, total)
+        context = multiprocessing.get_context("spawn")
+        with Listener(self.address, authkey=self.authkey) as listener:
+            address = listener.address
+            if self.remote_workers:
+                self.output(f"Ожидание {self.remote_workers} удаленных воркеров: python -m perf --connect {address[0]}:{address[1]}")
+            processes = [
+                context.Process(target=run_worker, args=(address, self.authkey), name=f"load-worker-{number}")
+                for number in range(self.workers)
+            ]
+            for process in processes:
+                process.start()
+            try:
+                self._accept(listener, total)
+                for number, (conn, part) in enumerate(zip(self._connections, parts)):
+                    conn.send({
+                        "config": part.model_dump(),
+                        "server_envs": self.server_envs.model_dump(),
+                        "worker": number,
+                        "pool_size": self.pool_size,
+                        "log_level": self.log_level,
+                        "interval": self.interval
+                    })
+                self._collect()
+            finally:
+                self.stop()
+                for conn in self._connections:
+                    conn.close()
+                for process in processes:
+                    process.join(timeout=self.interval + 5)
+                    if process.is_alive():
+                        process.terminate()
+        return self.report()
+
+    def _accept(self, listener: Listener, total: int):
+        # accept блокирует, поэтому ждем в отдельном потоке, чтобы упавший при старте воркер не повесил запуск
+        def accept():
+            while len(self._connections) < total:
+                self._connections.append(listener.accept())
+
+        thread = threading.Thread(target=accept, name="accept", daemon=True)
+        thread.start()
+        thread.join(self.connect_timeout)
+        if len(self._connections) < total:
+            raise TimeoutError(f"За {self.connect_timeout}s подключились {len(self._connections)} воркеров из {total}")
+
+    def _collect(self):
+        """Принимает замеры, пока все воркеры не пришлют итоговые, и печатает сводку каждые interval секунд"""
+        pending = list(self._connections)
+        started = last_print = time.monotonic()
+        last_count = 0
+        while pending:
+            for conn in wait(pending, timeout=self.interval):
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    pending.remove(conn)
+                    logging.warning("Воркер отключился, не прислав итоговые замеры")
+                    continue
+                self.snapshots[message["worker"]] = message
+                if message["final"]:
+                    pending.remove(conn)
+            now = time.monotonic()
+            if now - last_print >= self.interval:
+                last_count = self._print_live(now - started, now - last_print, last_count)
+                last_print = now
+
+    def _print_live(self, elapsed: float, window: float, last_count: int) -> int:
+        histogram, errors = Histogram(), 0
+        for merged, merged_errors in LatencyStats.merge([s["operations"] for s in self.snapshots.values()]).values():
+            histogram.merge(merged)
+            errors += merged_errors
+        active = sum(s["active"] for s in self.snapshots.values())
+        dropped = sum(s["dropped"] for s in self.snapshots.values())
+        self.output(
+            f"[{elapsed:7.1f}s] rps {(histogram.count - last_count) / window:8.1f}, "
+            f"ошибок {errors / histogram.count * 100 if histogram.count else 0:5.1f}%, "
+            f"p50 {histogram.percentile(50):.3f}s, p95 {histogram.percentile(95):.3f}s, "
+            f"активных {active}/{self.config.users}, пропущено {dropped}"
+        )
+        return histogram.count
+
+    def report(self) -> dict:
+        snapshots = list(self.snapshots.values())
+        return summarize(
+            [s["operations"] for s in snapshots],
+            [s["endpoints"] for s in snapshots],
+            max((s["elapsed"] for s in snapshots), default=0.0),
+            sum(s["dropped"] for s in snapshots)
+        )
@@ -0,0 +1,145 @@
+import time
+import queue
+import random
+import logging
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from faker import Faker
+from grpc import insecure_channel
+from internal.pb.niffler_currency_pb2_pbreflect import NifflerCurrencyServiceClient
+from models.config import ServerEnvs
+from perf.config import LoadConfig
+from perf.journeys import JOURNEYS, VirtualUser, run_journey
+from utils.evidence import evidence, EvidenceRecorder
+from utils.latency_stats import LatencyStats
+from utils.transport import transport
+
+LOGS_DIR = Path(__file__).resolve().parent.parent / "logs"
+
+
+def setup_process(config: LoadConfig, pool_size: int | None, log_level: str, log_name: str = "load.log"):
+    """Общая настройка процесса нагрузки: логи в файл, без вложений allure, пул на всех пользователей"""
+    LOGS_DIR.mkdir(parents=True, exist_ok=True)
+    logging.basicConfig(
+        filename=LOGS_DIR / log_name,
+        level=log_level.upper(),
+        format="%(asctime)s %(levelname)s %(threadName)s %(message)s"
+    )
+    evidence.configure(EvidenceRecorder.OFF)
+    # Повторы транспорта спрятали бы ошибки стенда от замеров
+    transport.configure(pool_size=pool_size or config.users, retries=0)
+
+
+class LoadEngine:
+    """Запускает сценарии JOURNEYS виртуальными пользователями по LoadConfig.
+
+    Пользователь регистрируется и логинится при первом сценарии, поэтому при ramp_up
+    регистрация тоже распределяется по времени. У каждого пользователя свои сессии,
+    соединения берутся из общего пула транспорта.
+    """
+
+    def __init__(self, config: LoadConfig, server_envs: ServerEnvs, stats: LatencyStats | None = None):
+        unknown = set(config.journeys) - set(JOURNEYS)
+        if unknown:
+            raise ValueError(f"Неизвестные сценарии: {', '.join(sorted(unknown))}. Доступны: {', '.join(JOURNEYS)}")
+        self.config = config
+        self.server_envs = server_envs
+        self.stats = stats or LatencyStats()
+        self.names = [name for name, weight in config.journeys.items() if weight > 0]
+        self.weights = [config.journeys[name] for name in self.names]
+        self.started = 0.0
+        self.finished = 0.0
+        self.dropped = 0
+        self.active = 0
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        grpc_client = None
+        if config.grpc:
+            grpc_client = NifflerCurrencyServiceClient(insecure_channel(server_envs.currency_service_host))
+        faker = Faker()
+        usernames = config.usernames()
+        self.users = [
+            VirtualUser(username, config, server_envs, self.stats, usernames, faker, grpc_client)
+            for username in usernames
+        ]
+
+    @property
+    def elapsed(self) -> float:
+        if not self.started:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self) -> "LoadEngine":
+        self.started = time.monotonic()
+        logging.info(f"Нагрузка: {self.config.model_dump()}")
+        try:
+            if self.config.rate is None:
+                self._run_closed()
+            else:
+                self._run_open()
+        finally:
+            self.finished = time.monotonic()
+            for user in self.users:
+                user.close()
+        return self
+
+    def _deadline_passed(self) -> bool:
+        return self._stop.is_set() or time.monotonic() - self.started >= self.config.duration
+
+    def _iteration(self, user: VirtualUser):
+        with self._lock:
+            self.active += 1
+        try:
+            if user.spends_client is None:
+                user.setup()
+            run_journey(user, random.choices(self.names, self.weights)[0])
+        except Exception as e:
+            logging.warning(f"{user.username}: не удалось подготовить пользователя: {str(e)}")
+            # Без паузы пользователь без токена засыпал бы стенд регистрациями
+            self._stop.wait(1)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def _run_closed(self):
+        """Закрытая модель: пользователь i стартует через ramp_up * i / users и крутит сценарии до конца"""
+        def loop(number: int, user: VirtualUser):
+            if self._stop.wait(self.config.ramp_up * number / len(self.users)):
+                return
+            while not self._deadline_passed():
+                self._iteration(user)
+                if self.config.think_time:
+                    self._stop.wait(self.config.think_time)
+
+        with ThreadPoolExecutor(max_workers=len(self.users), thread_name_prefix="vu") as executor:
+            for number, user in enumerate(self.users):
+                executor.submit(loop, number, user)
+
+    def _run_open(self):
+        """Открытая модель: запуски идут с частотой rate независимо от времени ответа.
+        Частота растет линейно от нуля за ramp_up, запуск без свободного пользователя пропускается"""
+        free: queue.SimpleQueue[VirtualUser] = queue.SimpleQueue()
+        for user in self.users:
+            free.put(user)
+
+        def iteration(user: VirtualUser):
+            try:
+                self._iteration(user)
+            finally:
+                free.put(user)
+
+        with ThreadPoolExecutor(max_workers=len(self.users), thread_name_prefix="vu") as executor:
+            number = 0
+            while not self._deadline_passed():
+                if self._stop.wait(max(self.started + self.config.arrival_time(number) - time.monotonic(), 0)):
+                    break
+                try:
+                    executor.submit(iteration, free.get_nowait())
+                except queue.Empty:
+                    with self._lock:
+                        self.dropped += 1
+                number += 1
@@ -0,0 +1,202 @@
+import time
+import random
+import logging
+from contextlib import contextmanager
+from typing import Callable
+from faker import Faker
+from google.protobuf import empty_pb2
+from clients.oauth_client import OAuthClient
+from clients.soap_client import SoapClient
+from clients.spends_client import SpendsClient
+from clients.users_client import UsersClient
+from internal.pb.niffler_currency_pb2 import CalculateRequest, CurrencyValues
+from internal.pb.niffler_currency_pb2_pbreflect import NifflerCurrencyServiceClient
+from models.category import CategoryAdd
+from models.config import ServerEnvs, ClientEnvs
+from models.soap import PageInfo
+from models.spend import SpendAdd, SpendGet
+from perf.config import LoadConfig
+from utils.generate_datetime import generate_random_datetime
+from utils.latency_stats import LatencyStats
+from utils.mock_data import MockData
+
+
+class VirtualUser:
+    """Пользователь нагрузки со своими клиентами и токеном.
+
+    Каждая операция сценария замеряется в stats под своим именем, ошибкой считается
+    любое исключение клиента: клиенты падают через assert, SOAP и gRPC - своими исключениями.
+    """
+
+    def __init__(
+        self, username: str, config: LoadConfig, server_envs: ServerEnvs, stats: LatencyStats,
+        peers: list[str], faker: Faker, grpc_client: NifflerCurrencyServiceClient | None = None
+    ):
+        self.username = username
+        self.config = config
+        self.server_envs = server_envs
+        self.stats = stats
+        self.peers = [peer for peer in peers if peer != username]
+        self.faker = faker
+        self.grpc_client = grpc_client
+        self.soap_client = SoapClient(server_envs, ClientEnvs(test_username=username, test_password=config.password))
+        self.spends_client: SpendsClient | None = None
+        self.users_client: UsersClient | None = None
+        self.spends: list[SpendGet] = []
+
+    @contextmanager
+    def measure(self, operation: str):
+        started = time.perf_counter()
+        error = True
+        try:
+            yield
+            error = False
+        finally:
+            self.stats.record(operation, time.perf_counter() - started, error)
+
+    def setup(self):
+        """Регистрирует пользователя, если его еще нет, и получает токен"""
+        oauth_client = OAuthClient(self.server_envs)
+        try:
+            with self.measure("register"):
+                oauth_client.register(self.username, self.config.password)
+        finally:
+            oauth_client.session.close()
+        self.login()
+
+    def login(self):
+        oauth_client = OAuthClient(self.server_envs)
+        try:
+            with self.measure("login"):
+                token = oauth_client.get_token(self.username, self.config.password).access_token
+        finally:
+            oauth_client.session.close()
+        self.close()
+        self.spends_client = SpendsClient(self.server_envs, ClientEnvs(test_username=self.username, test_password=self.config.password), token)
+        self.users_client = UsersClient(self.server_envs, token)
+
+    def close(self):
+        for client in (self.spends_client, self.users_client):
+            if client is not None:
+                client.session.close()
+
+    def new_spending(self) -> SpendAdd:
+        return SpendAdd(
+            amount=self.faker.random_number(digits=4),
+            category=CategoryAdd(name=random.choice(MockData.CATEGORIES)),
+            currency=random.choice(MockData.CURRENCIES),
+            description=self.faker.sentence(nb_words=3),
+            spendDate=generate_random_datetime(),
+            username=self.username
+        )
+
+
+def login_journey(user: VirtualUser):
+    user.login()
+    with user.measure("current_user"):
+        user.users_client.get_current_user()
+
+
+def add_journey(user: VirtualUser):
+    for _ in range(random.randint(1, 3)):
+        with user.measure("add_spending"):
+            user.spends.append(user.spends_client.add_spending(user.new_spending()))
+
+
+def list_journey(user: VirtualUser):
+    """Главная страница: первая страница трат, категории и статистика"""
+    with user.measure("list_spendings"):
+        spendings, _ = user.spends_client.get_spendings_page(0, size=10)
+    with user.measure("list_categories"):
+        user.spends_client.get_all_categories()
+    with user.measure("current_user"):
+        user.users_client.get_current_user()
+    if not user.spends:
+        user.spends = spendings
+
+
+def search_journey(user: VirtualUser):
+    query = random.choice(user.spends).description.split()[0] if user.spends else user.faker.word()
+    with user.measure("search_spendings"):
+        user.spends_client.get_spendings_page(0, size=10, search_query=query)
+
+
+def edit_journey(user: VirtualUser):
+    if not user.spends:
+        return add_journey(user)
+    spend = random.choice(user.spends)
+    with user.measure("get_spending"):
+        spend = user.spends_client.get_spending_by_id(spend.id)
+    data = SpendAdd(
+        id=spend.id,
+        amount=spend.amount,
+        category=CategoryAdd(name=spend.category.name),
+        currency=spend.currency,
+        description=user.faker.sentence(nb_words=3),
+        spendDate=spend.spendDate,
+        username=user.username
+    )
+    with user.measure("edit_spending"):
+        updated = user.spends_client.update_spending(data)
+    user.spends = [updated if s.id == updated.id else s for s in user.spends]
+
+
+def delete_journey(user: VirtualUser):
+    if not user.spends:
+        return add_journey(user)
+    spend = user.spends.pop(random.randrange(len(user.spends)))
+    with user.measure("delete_spendings"):
+        result = user.spends_client.delete_spendings([spend.id], attempts=1)
+        assert not result.failed, f"Трата {spend.id} не удалена"
+
+
+def friends_journey(user: VirtualUser):
+    with user.measure("soap_all_users"):
+        user.soap_client.get_all_users_page(user.username, PageInfo(page=0, size=10))
+    with user.measure("soap_friends"):
+        user.soap_client.get_friends(user.username)
+    if not user.peers:
+        return
+    peer = random.choice(user.peers)
+    with user.measure("soap_invite"):
+        user.soap_client.send_friend_invitation(user.username, peer)
+    # Приглашение принимает второй пользователь, SOAP не проверяет, кто отправил запрос
+    with user.measure("soap_accept"):
+        user.soap_client.accept_friend_invitation(peer, user.username)
+    with user.measure("soap_remove_friend"):
+        user.soap_client.remove_friend(user.username, peer)
+
+
+def currencies_journey(user: VirtualUser):
+    if user.grpc_client is None:
+        return
+    with user.measure("grpc_all_currencies"):
+        user.grpc_client.get_all_currencies(empty_pb2.Empty())
+    with user.measure("grpc_calculate_rate"):
+        user.grpc_client.calculate_rate(
+            request=CalculateRequest(
+                spendCurrency=CurrencyValues.EUR,
+                desiredCurrency=CurrencyValues.RUB,
+                amount=float(user.faker.random_number(digits=3))
+            )
+        )
+
+
+JOURNEYS: dict[str, Callable[[VirtualUser], None]] = {
+    "login": login_journey,
+    "add": add_journey,
+    "list": list_journey,
+    "search": search_journey,
+    "edit": edit_journey,
+    "delete": delete_journey,
+    "friends": friends_journey,
+    "currencies": currencies_journey
+}
+
+
+def run_journey(user: VirtualUser, name: str):
+    """Выполняет сценарий. Ошибка уже учтена в замере операции и прерывает только этот сценарий"""
+    try:
+        JOURNEYS[name](user)
+    except Exception as e:
+        logging.warning(f"{user.username}: сценарий {name} прерван: {str(e)}")
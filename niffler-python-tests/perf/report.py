@@ -0,0 +1,30 @@
+from utils.latency_stats import LatencyStats
+
+
+def summarize(operations: list[dict], endpoints: list[dict], elapsed: float, dropped: int = 0) -> dict:
+    """Итоги нагрузки из дампов LatencyStats: по операциям сценариев и по ручкам сессий.
+    Дампы нескольких процессов складываются без потери точности перцентилей"""
+    report = {"elapsed": round(elapsed, 3), "dropped": dropped}
+    for name, dumps in (("operations", operations), ("endpoints", endpoints)):
+        rows = LatencyStats.summarize(LatencyStats.merge(dumps))
+        for row in rows.values():
+            row["rps"] = round(row["count"] / elapsed, 2) if elapsed else 0.0
+            row["error_rate"] = round(row["errors"] / row["count"], 4) if row["count"] else 0.0
+        report[name] = rows
+    return report
+
+
+def format_table(rows: dict, title: str = "operation") -> list[str]:
+    if not rows:
+        return []
+    width = max(len(key) for key in [*rows, title])
+    lines = [
+        f"{title:<{width}} {'count':>7} {'rps':>8} {'errors':>7} {'err%':>6} "
+        f"{'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+    ]
+    for key, row in rows.items():
+        lines.append(
+            f"{key:<{width}} {row['count']:>7} {row['rps']:>8.2f} {row['errors']:>7} {row['error_rate'] * 100:>5.1f}% "
+            f"{row['p50']:>7.3f}s {row['p95']:>7.3f}s {row['p99']:>7.3f}s {row['max']:>7.3f}s"
+        )
+    return lines
@@ -1,6 +1,7 @@
 import pytest
 import allure
 import random
+from typing import Callable
 from faker import Faker
 from utils.allure_data import Epic, Feature, Story
 from clients.soap_client import SoapClient
@@ -9,6 +10,7 @@ from models.enums import FriendshipStatus, Currency
 from models.user import UserData
 from marks import TestData
 from databases.userdata_db import UserdataDb
+from utils.friendship_graph import FriendshipSpec, FriendshipGraph
 
 pytestmark = [pytest.mark.allure_label(label_type="epic", value=Epic.app_name)]
 
@@ -258,6 +260,42 @@ class TestSoapUsers:
             assert status_code == 500
             assert page_result == error_text
     
+    @pytest.mark.friends_management
+    @allure.story(Story.friends_management)
+    def test_get_friends_page_across_graph(
+        self,
+        soap_client: SoapClient,
+        soap_friends_user: str,
+        friendship_graph: Callable[[FriendshipSpec], FriendshipGraph]
+    ):
+        """Тест постраничного обхода друзей через SOAP: каждый друг и входящее приглашение ровно на одной странице,
+        исходящие приглашения и пользователи без связей в список не попадают"""
+        graph = friendship_graph(FriendshipSpec(owner=soap_friends_user, friends=23, incoming=4, outgoing=3, strangers=5))
+        page_size = 10
+        
+        seen: list[dict] = []
+        page_result, status_code = soap_client.get_friends_page(soap_friends_user, PageInfo(page=0, size=page_size))
+        for page in range(page_result['totalPages']):
+            if page:
+                page_result, status_code = soap_client.get_friends_page(soap_friends_user, PageInfo(page=page, size=page_size))
+            with allure.step(f'Проверка страницы {page}'):
+                assert status_code == 200
+                assert page_result['number'] == page
+                assert len(page_result['users']) <= page_size
+            seen.extend(page_result['users'])
+        
+        statuses = {user.get('username'): user.get('friendshipStatus') for user in seen}
+        with allure.step('Проверка обхода всех страниц'):
+            assert len(statuses) == len(seen), "Пользователи повторяются на разных страницах"
+            assert page_result['totalElements'] == len(seen) == len(graph.friends) + len(graph.incoming)
+            for friend in graph.friends:
+                assert statuses.get(friend.username) == FriendshipStatus.FRIEND, f"Друг {friend.username} не найден"
+            for user in graph.incoming:
+                assert statuses.get(user.username) == FriendshipStatus.INVITE_RECEIVED, \
+                    f"Входящее приглашение от {user.username} не найдено"
+            for user in graph.outgoing + graph.strangers:
+                assert user.username not in statuses, f"{user.username} не должен быть в списке друзей"
+    
     @pytest.mark.friends_management
     @allure.story(Story.friends_management)
     def test_send_friend_invitation(
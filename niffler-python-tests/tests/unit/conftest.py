@@ -0,0 +1,12 @@
+import pytest
+
+
+# Тестам инструментов стенд не нужен: подменяем автоматические фикстуры очистки и токена
+@pytest.fixture(scope="session", autouse=True)
+def cleanup():
+    yield
+
+
+@pytest.fixture(scope="session", autouse=True)
+def token_data():
+    yield
@@ -0,0 +1,99 @@
+import json
+import httpx
+import pytest
+import allure
+import asyncio
+from collections import Counter
+from utils.allure_data import Epic, Feature
+from utils.spends_deletion import SpendsDeletion
+from clients.spends_client import SpendsClient
+from clients.async_spends_client import AsyncSpendsClient
+from models.config import ServerEnvs, ClientEnvs
+
+pytestmark = [pytest.mark.allure_label(label_type="epic", value=Epic.app_name)]
+
+class FakeGateway:
+    """Ручки трат и категорий gateway в памяти: удаление части с failing_id первый раз отвечает 503"""
+    
+    def __init__(self, spends: int, failing_id: str | None = None):
+        self.spends = [self.spend(number) for number in range(spends)]
+        self.categories = [{"id": "c1", "name": "Обучение", "username": "duck", "archived": False}]
+        self.failing_id = failing_id
+        self.calls = Counter()
+        self.deleted_chunks: list[list[str]] = []
+    
+    @staticmethod
+    def spend(number: int) -> dict:
+        return {
+            "id": f"s{number}", "amount": number, "description": f"Трата {number}", "currency": "RUB", "username": "duck",
+            "spendDate": "2024-01-15T10:30:00.000+00:00",
+            "category": {"id": "c1", "name": "Обучение", "username": "duck", "archived": False}
+        }
+    
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.calls[f"{request.method} {path}"] += 1
+        if path == SpendsClient.DELETE_SPENDS_ENDPOINT:
+            ids = request.url.params["ids"].split(",")
+            if self.failing_id in ids:
+                self.failing_id = None
+                return httpx.Response(503, text="Service Unavailable")
+            self.deleted_chunks.append(ids)
+            self.spends = [s for s in self.spends if s["id"] not in ids]
+            return httpx.Response(200)
+        if path == SpendsClient.ALL_SPENDS_ENDPOINT:
+            page, size = int(request.url.params["page"]), int(request.url.params["size"])
+            content = self.spends[page * size:(page + 1) * size]
+            return httpx.Response(200, json={"content": content, "number": page, "last": (page + 1) * size >= len(self.spends)})
+        if path == SpendsClient.GET_CATEGORIES_ENDPOINT:
+            return httpx.Response(200, json=self.categories)
+        return httpx.Response(404, text=json.dumps({"path": path}))
+
+@pytest.mark.unit
+@allure.feature(Feature.test_tools)
+class TestAsyncSpendsClient:
+    
+    @pytest.fixture(autouse=True)
+    def no_retry_delay(self, monkeypatch):
+        monkeypatch.setattr(SpendsDeletion, "RETRY_DELAY", 0)
+    
+    def run(self, gateway: FakeGateway, scenario):
+        async def main():
+            client = AsyncSpendsClient(
+                ServerEnvs.model_construct(gateway_url="http://gateway.niffler.dc:8090"),
+                ClientEnvs(test_username="duck", test_password="12345"),
+                token="token",
+                concurrency=4,
+                transport=httpx.MockTransport(gateway.handle)
+            )
+            try:
+                return await scenario(client)
+            finally:
+                await client.close()
+        return asyncio.run(main())
+    
+    def test_clear_spendings_in_chunks_with_retry(self):
+        gateway = FakeGateway(spends=250, failing_id="s120")
+        result = self.run(gateway, lambda client: client.clear_spendings())
+        
+        assert result.deleted == 250 and result.failed == []
+        assert gateway.spends == []
+        assert sorted(len(chunk) for chunk in gateway.deleted_chunks) == [50, 100, 100]
+        assert gateway.calls[f"DELETE {SpendsClient.DELETE_SPENDS_ENDPOINT}"] == 4, "Неудачная часть повторяется один раз"
+    
+    def test_delete_spendings_reports_failed_ids(self):
+        gateway = FakeGateway(spends=3, failing_id="s0")
+        result = self.run(gateway, lambda client: client.delete_spendings(["s0", "s1", "s2"], chunk_size=2, attempts=1))
+        
+        assert result.deleted == 1
+        assert result.failed == ["s0", "s1"]
+    
+    def test_category_by_name_is_cached(self):
+        gateway = FakeGateway(spends=0)
+        
+        async def scenario(client: AsyncSpendsClient):
+            return [await client.get_category_by_name("Обучение") for _ in range(3)]
+        
+        categories = self.run(gateway, scenario)
+        assert [c.id for c in categories] == ["c1"] * 3
+        assert gateway.calls[f"GET {SpendsClient.GET_CATEGORIES_ENDPOINT}"] == 1
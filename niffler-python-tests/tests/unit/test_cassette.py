@@ -0,0 +1,35 @@
+import json
+import pytest
+import allure
+from utils.allure_data import Epic, Feature
+from utils.cassette import Cassette
+
+pytestmark = [pytest.mark.allure_label(label_type="epic", value=Epic.app_name)]
+
+RECORDED_ID = "11111111-1111-1111-1111-111111111111"
+CURRENT_ID = "22222222-2222-2222-2222-222222222222"
+URL = "http://gateway.niffler.dc:8090/api/spends"
+
+
+def entry(test: str, url: str, content: str) -> dict:
+    return {"test": test, "method": "GET", "url": url, "body": "", "status": 200, "reason": "OK", "headers": [], "content": content}
+
+
+@pytest.mark.unit
+@allure.feature(Feature.test_tools)
+class TestCassette:
+    
+    def test_substitutions_are_reset_between_tests(self, tmp_path):
+        (tmp_path / "main.jsonl").write_text("\n".join(json.dumps(line) for line in [
+            entry("test_a", f"{URL}/{RECORDED_ID}", json.dumps({"id": RECORDED_ID})),
+            entry("test_b", f"{URL}/all", json.dumps([{"id": RECORDED_ID}]))
+        ]), encoding="utf-8")
+        cassette = Cassette(tmp_path, Cassette.REPLAY)
+        
+        cassette.start("test_a")
+        response = cassette.replay("GET", f"{URL}/{CURRENT_ID}", None)
+        assert json.loads(response.content) == {"id": CURRENT_ID}
+        
+        cassette.start("test_b")
+        response = cassette.replay("GET", f"{URL}/all", None)
+        assert json.loads(response.content) == [{"id": RECORDED_ID}]
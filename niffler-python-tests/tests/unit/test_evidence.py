@@ -0,0 +1,79 @@
+import gzip
+import json
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+import allure
+import allure_commons
+from allure_commons.logger import AllureFileLogger
+from allure_commons import model2
+from allure_commons.reporter import AllureReporter
+from allure_commons.types import AttachmentType
+from utils.allure_data import Epic, Feature
+from utils.evidence import AttachmentPolicy, EvidenceAttachment
+
+pytestmark = [pytest.mark.allure_label(label_type="epic", value=Epic.app_name)]
+
+@pytest.mark.unit
+@allure.feature(Feature.test_tools)
+class TestAttachmentPolicy:
+    
+    @pytest.fixture
+    def results_dir(self, tmp_path):
+        file_logger = AllureFileLogger(tmp_path)
+        allure_commons.plugin_manager.register(file_logger)
+        yield tmp_path
+        allure_commons.plugin_manager.unregister(file_logger)
+    
+    @pytest.mark.parametrize("gzip_bytes", [0, 64])
+    def test_duplicate_references_written_file(self, results_dir, gzip_bytes: int):
+        body = json.dumps([{"id": number, "description": "Одинаковый ответ"} for number in range(20)])
+        policy = AttachmentPolicy(gzip_bytes=gzip_bytes)
+        # Элементы AllureReporter общие для потока, поэтому тест планируется прямо перед вложениями
+        policy.reporter = AllureReporter()
+        policy.reporter.schedule_test("evidence", model2.TestResult(uuid="evidence"))
+        try:
+            for _ in range(2):
+                policy.attach(EvidenceAttachment(body, "Response", AttachmentType.JSON))
+        finally:
+            attachments = policy.reporter.get_test("evidence").attachments
+            policy.reporter.drop_test("evidence")
+        
+        assert len(attachments) == 2
+        assert policy.stats["deduplicated"] == 1
+        assert attachments[0].source == attachments[1].source
+        assert attachments[0].type == attachments[1].type
+        written = (results_dir / attachments[1].source).read_bytes()
+        assert (gzip.decompress(written) if gzip_bytes else written) == body.encode("utf-8")
+    
+    def test_stats_from_threads(self, results_dir):
+        policy = AttachmentPolicy()
+        policy.reporter = AllureReporter()
+        policy.reporter.schedule_test("evidence", model2.TestResult(uuid="evidence"))
+        bodies = [f"Тело {number % 50}" for number in range(2000)]
+        try:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                list(executor.map(lambda body: policy.attach(EvidenceAttachment(body, "Body", AttachmentType.TEXT)), bodies))
+        finally:
+            policy.reporter.drop_test("evidence")
+        
+        assert policy.stats["attachments"] == len(bodies)
+        assert policy.stats["deduplicated"] == len(bodies) - 50
+        assert policy.stats["bytes_in"] == sum(len(body.encode("utf-8")) for body in bodies)
+    
+    @pytest.mark.parametrize("max_bytes", [101, 102, 103])
+    def test_truncated_body_is_valid_text(self, results_dir, max_bytes: int):
+        body = json.dumps([{"description": "Кириллица в описании траты"} for _ in range(50)], ensure_ascii=False)
+        policy = AttachmentPolicy(max_bytes=max_bytes)
+        policy.reporter = AllureReporter()
+        policy.reporter.schedule_test("evidence", model2.TestResult(uuid="evidence"))
+        try:
+            policy.attach(EvidenceAttachment(body, "Response", AttachmentType.JSON))
+        finally:
+            attachment = policy.reporter.get_test("evidence").attachments[0]
+            policy.reporter.drop_test("evidence")
+        
+        assert attachment.type == "text/plain"
+        assert attachment.source.endswith(".txt")
+        text = (results_dir / attachment.source).read_bytes().decode("utf-8")
+        assert body.startswith(text.split("\n\n... пропущено")[0])
+        assert body.endswith(text.rsplit("...\n\n", 1)[1])
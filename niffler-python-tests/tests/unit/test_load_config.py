@@ -0,0 +1,30 @@
+import pytest
+import allure
+from utils.allure_data import Epic, Feature
+from perf.config import LoadConfig
+
+pytestmark = [pytest.mark.allure_label(label_type="epic", value=Epic.app_name)]
+
+@pytest.mark.unit
+@allure.feature(Feature.test_tools)
+class TestLoadConfig:
+    
+    @pytest.mark.parametrize("rate, ramp_up", [(20, 10), (7.5, 30), (200, 4)])
+    def test_ramp_up_arrivals(self, rate: float, ramp_up: float):
+        config = LoadConfig(rate=rate, ramp_up=ramp_up)
+        arrivals = sum(1 for number in range(int(rate * ramp_up) * 2) if config.arrival_time(number) < ramp_up)
+        assert abs(arrivals - rate * ramp_up / 2) <= 1, f"За разгон {arrivals} запусков вместо {rate * ramp_up / 2}"
+    
+    def test_first_arrivals_are_not_delayed(self):
+        config = LoadConfig(rate=20, ramp_up=60)
+        assert config.arrival_time(0) == 0
+        assert config.arrival_time(1) < 3, "Второй запуск не должен ждать все время разгона"
+    
+    def test_arrivals_after_ramp_up(self):
+        config = LoadConfig(rate=20, ramp_up=10)
+        gaps = [config.arrival_time(number + 1) - config.arrival_time(number) for number in range(150, 250)]
+        assert all(gap == pytest.approx(1 / 20) for gap in gaps)
+    
+    def test_arrivals_without_ramp_up(self):
+        config = LoadConfig(rate=4)
+        assert [config.arrival_time(number) for number in range(5)] == [0, 0.25, 0.5, 0.75, 1]
@@ -0,0 +1,28 @@
+import os
+import json
+import pytest
+import allure
+from utils.allure_data import Epic, Feature
+from utils.lock import SharedCounter, _holder_id
+
+pytestmark = [pytest.mark.allure_label(label_type="epic", value=Epic.app_name)]
+
+@pytest.mark.unit
+@allure.feature(Feature.test_tools)
+class TestSharedCounter:
+    
+    def test_holder_with_reused_pid_is_dropped(self, tmp_path):
+        counter = SharedCounter(tmp_path / "resource.count")
+        # Ссылка процесса, который раньше работал под нашим PID
+        counter.path.write_text(json.dumps({f"{os.getpid()}:1": 2}), encoding="utf-8")
+        assert counter.increment() == 1
+        assert json.loads(counter.path.read_text(encoding="utf-8")) == {_holder_id(): 1}
+    
+    def test_live_holder_is_kept(self, tmp_path):
+        counter = SharedCounter(tmp_path / "resource.count")
+        assert counter.increment() == 1
+        assert counter.increment() == 2
+        assert counter.value() == 2
+        assert counter.decrement() == 1
+        assert counter.decrement() == 0
+        assert not counter.path.exists()
@@ -0,0 +1,43 @@
+import json
+import time
+import base64
+import stat
+import pytest
+import allure
+from utils.allure_data import Epic, Feature
+from utils.token_cache import TokenCache
+from models.auth_user import TokenData
+
+pytestmark = [pytest.mark.allure_label(label_type="epic", value=Epic.app_name)]
+
+def make_jwt(payload: dict) -> str:
+    def encode(part: dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(part).encode("utf-8")).rstrip(b"=").decode("ascii")
+    return f"{encode({'alg': 'RS256', 'kid': 'key'})}.{encode(payload)}.signature"
+
+@pytest.mark.unit
+@allure.feature(Feature.test_tools)
+class TestTokenCache:
+    
+    @pytest.fixture
+    def token_data(self) -> TokenData:
+        return TokenData(
+            access_token=make_jwt({"exp": int(time.time()) + 3600}),
+            code_verifier="verifier",
+            code_challenge="challenge",
+            id_token="id",
+            cookies=[{"name": "JSESSIONID", "value": "session", "path": "/", "domain": "auth.niffler.dc", "secure": False}]
+        )
+    
+    def test_cache_file_is_private_and_without_cookies(self, tmp_path, token_data: TokenData):
+        cache = TokenCache(tmp_path / "tokens")
+        cache.put("duck", "http://auth.niffler.dc:9000", token_data)
+        
+        files = list((tmp_path / "tokens").iterdir())
+        assert len(files) == 1, f"Лишние файлы в кэше: {files}"
+        assert stat.S_IMODE(files[0].stat().st_mode) == 0o600
+        assert json.loads(files[0].read_text(encoding="utf-8"))["cookies"] == []
+        
+        cached = cache.get("duck", "http://auth.niffler.dc:9000", key_ids={"key"})
+        assert cached.access_token == token_data.access_token
+        assert cached.cookies == []
@@ -9,6 +9,7 @@ class Feature:
     user_profile = "User profile"
     userdata = "User data management"
     currencies = "Currencies"
+    test_tools = "Test tools"
 
 class Story:
     add_spending = "Add spendings"
@@ -1,8 +1,50 @@
 import allure
-from requests import Response, JSONDecodeError
+import httpx
+from requests import Response, PreparedRequest
+from contextlib import ExitStack
+from contextvars import ContextVar
+from functools import lru_cache, wraps
+from http import HTTPStatus
+from typing import NamedTuple, Any
+from jinja2 import Environment, PackageLoader, Template, select_autoescape
 import curlify
 import json
 import requests
+from utils.evidence import evidence, EvidenceAttachment
+from utils.json_codec import response_json, dumps_pretty
+
+
+class RequestSnapshot(NamedTuple):
+    """Поля запроса, которые нужны шаблону отчета"""
+    method: str | None
+    url: str | None
+    body: Any
+    headers: dict[str, str]
+    
+    @classmethod
+    def from_request(cls, request: PreparedRequest | httpx.Request) -> "RequestSnapshot":
+        if isinstance(request, httpx.Request):
+            return cls(request.method, str(request.url), request.content or None, dict(request.headers))
+        return cls(request.method, request.url, request.body, dict(request.headers))
+
+
+@lru_cache(maxsize=None)
+def get_template(name: str) -> Template:
+    """Шаблон из schemas/templates. Окружение Jinja и скомпилированный шаблон создаются один раз на процесс"""
+    env = Environment(
+        loader=PackageLoader(package_name="schemas"),
+        autoescape=select_autoescape()
+    )
+    return env.get_template(name)
+
+
+def render_request(request: PreparedRequest | httpx.Request) -> str:
+    """HTML-отчет о запросе с curl для вложения в allure"""
+    snapshot = RequestSnapshot.from_request(request)
+    return get_template("http-colored-request.ftl").render(
+        request=snapshot,
+        curl=curlify.to_curl(snapshot)
+    )
 
 def raise_for_status(response: Response):
     try:
@@ -12,58 +54,62 @@ def raise_for_status(response: Response):
         if "register" not in response.request.url and response.status_code == 400:
             raise requests.HTTPError(f"{str(e)}: {response.text}") from e
 
+def request_attachments(response: Response | httpx.Response) -> list[EvidenceAttachment]:
+    """Вложения HTTP запроса: отчет о запросе, тело и заголовки ответа"""
+    attachments = [
+        EvidenceAttachment(render_request(response.request), "Request", allure.attachment_type.HTML, ".html")
+    ]
+    try:
+        attachments.append(EvidenceAttachment(
+            dumps_pretty(response_json(response)),
+            f"Response json {response.status_code}",
+            allure.attachment_type.JSON,
+            ".html"
+        ))
+    except (json.JSONDecodeError, UnicodeDecodeError, TypeError):
+        attachments.append(EvidenceAttachment(
+            response.text.encode("utf-8"),
+            f"Response text {response.status_code}",
+            allure.attachment_type.TEXT,
+            ".txt"
+        ))
+    attachments.append(EvidenceAttachment(
+        dumps_pretty(dict(response.headers)),
+        f"Response headers {response.status_code}",
+        allure.attachment_type.JSON,
+        ".json"
+    ))
+    return attachments
+
+def soap_request_attachments(xml_data: str, response: Response) -> list[EvidenceAttachment]:
+    return [
+        EvidenceAttachment(xml_data.encode("utf-8"), "SOAP Request XML", allure.attachment_type.XML, ".xml"),
+        EvidenceAttachment(
+            response.text.encode("utf-8"),
+            f"SOAP Response {response.status_code}",
+            allure.attachment_type.XML,
+            ".xml"
+        ),
+        EvidenceAttachment(
+            dumps_pretty(dict(response.headers)),
+            f"Response headers {response.status_code}",
+            allure.attachment_type.JSON,
+            ".json"
+        )
+    ]
+
 def allure_attach_request(function):
-    """Декоратор логирования запроса, хедеров запроса, ответа, хедеров ответа в allure шаг и allure attachment, а также в консоль."""
+    """Декоратор логирования запроса, хедеров запроса, ответа, хедеров ответа в allure шаг и allure attachment, а также в консоль.
+    
+    Когда и будут ли созданы вложения, решает режим --evidence.
+    """
     def wrapper(*args, **kwargs):
-        from jinja2 import Environment, PackageLoader, select_autoescape
         method, url = args[1], args[2]
-        env = Environment(
-            loader=PackageLoader(package_name="schemas"),
-            autoescape=select_autoescape()
-        )
-        template = env.get_template("http-colored-request.ftl")
-        
+        step = f"{method} {url}"
         
-        with allure.step(f"{method} {url}"):
-            
+        with allure.step(step):
             response: Response = function(*args, **kwargs)
-            curl = curlify.to_curl(response.request)
-            
-            prepare_render = {
-                "request": response.request,
-                "curl": curl
-            }
-            render = template.render(prepare_render)
-            
-            allure.attach(
-                body=render,
-                name="Request",
-                attachment_type=allure.attachment_type.HTML,
-                extension=".html"
-            )
-            # logging.debug(curl)
-            # logging.debug(response.text)
-
-            try:
-                allure.attach(
-                    body=json.dumps(response.json(), indent=4).encode("utf-8"), 
-                    name=f"Response json {response.status_code}", 
-                    attachment_type=allure.attachment_type.JSON, 
-                    extension=".html"
-                )
-            except (JSONDecodeError, TypeError):
-                allure.attach(
-                    body=response.text.encode("utf-8"), 
-                    name=f"Response text {response.status_code}", 
-                    attachment_type=allure.attachment_type.TEXT, 
-                    extension=".txt"
-                )
-            allure.attach(
-                body=json.dumps(dict(response.headers), indent=4).encode("utf-8"), 
-                name=f"Response headers {response.status_code}", 
-                attachment_type=allure.attachment_type.JSON, 
-                extension=".json"
-            )
+            evidence.record(step, lambda: request_attachments(response))
         raise_for_status(response)    
         return response
     return wrapper
@@ -76,30 +122,57 @@ def allure_attach_soap_request(function):
         
         with allure.step("SOAP Request"):
             response: Response = function(*args, **kwargs)
-            
-            allure.attach(
-                body=xml_data.encode("utf-8"),
-                name="SOAP Request XML",
-                attachment_type=allure.attachment_type.XML,
-                extension=".xml"
-            )
-            
-            allure.attach(
-                body=response.text.encode("utf-8"), 
-                name=f"SOAP Response {response.status_code}", 
-                attachment_type=allure.attachment_type.XML, 
-                extension=".xml"
-            )
-            
-            allure.attach(
-                body=json.dumps(dict(response.headers), indent=4).encode("utf-8"), 
-                name=f"Response headers {response.status_code}", 
-                attachment_type=allure.attachment_type.JSON, 
-                extension=".json"
-            )
+            evidence.record("SOAP Request", lambda: soap_request_attachments(xml_data, response))
         
         # Для проверки некоторых кейсов с ошибкой 500 не выбрасываем исключение
         if response.status_code != 500:
             response.raise_for_status()
         return response
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+
+# Шаги allure открытых async-методов клиента. У каждой задачи asyncio своя копия контекста,
+# поэтому параллельные запросы не видят шаги друг друга
+async_steps: ContextVar[tuple[str, ...]] = ContextVar("async_steps", default=())
+
+def allure_async_step(title: str):
+    """Аналог allure.step для async-методов клиента.
+    
+    Шаг открывается не при вызове, а вместе с шагом запроса, когда ответ уже получен:
+    запросы в цикле событий выполняются вперемешку, а стек шагов allure общий на поток.
+    """
+    def decorator(function):
+        @wraps(function)
+        async def wrapper(*args, **kwargs):
+            token = async_steps.set(async_steps.get() + (title,))
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                async_steps.reset(token)
+        return wrapper
+    return decorator
+
+def allure_attach_async_request(function):
+    """Декоратор логирования async-запроса httpx в allure, как allure_attach_request.
+    
+    Шаги метода клиента и запроса открываются и закрываются без await между ними, поэтому
+    ответы параллельных запросов попадают в отчет по одному в порядке завершения.
+    """
+    @wraps(function)
+    async def wrapper(*args, **kwargs):
+        method, url = args[1], args[2]
+        step = f"{method} {url}"
+        
+        response: httpx.Response = await function(*args, **kwargs)
+        with ExitStack() as steps:
+            for title in async_steps.get() + (step,):
+                steps.enter_context(allure.step(title))
+            evidence.record(step, lambda: request_attachments(response))
+        if response.status_code == HTTPStatus.BAD_REQUEST:
+            raise httpx.HTTPStatusError(
+                f"{response.status_code} Bad Request for url: {response.url}: {response.text}",
+                request=response.request,
+                response=response
+            )
+        return response
+    return wrapper
@@ -0,0 +1,105 @@
+import io
+import os
+import json
+import uuid
+import queue
+import logging
+import threading
+import pytest
+import allure_commons
+from attr import asdict
+from typing import Any, Callable
+from allure_commons.logger import AllureFileLogger, INDENT
+
+
+class AsyncAllureFileLogger(AllureFileLogger):
+    """AllureFileLogger, который пишет результаты и вложения в allure-results из отдельного потока.
+
+    Метаданные вложения по-прежнему добавляются в шаг на потоке теста, в очередь
+    уходит только запись файла. Очередь ограничена, поэтому при медленном диске
+    тест начинает ждать, а не накапливает вложения в памяти без предела.
+    """
+
+    def __init__(self, report_dir, queue_size: int = 1000):
+        super().__init__(report_dir, clean=False)
+        self._queue: queue.Queue[tuple[Callable, tuple] | None] = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name="allure-writer", daemon=True)
+        self._thread.start()
+        self.written = 0
+        self.max_queue = 0
+
+    def _submit(self, func: Callable, *args):
+        self._queue.put((func, args))
+        self.max_queue = max(self.max_queue, self._queue.qsize())
+
+    def _run(self):
+        while (task := self._queue.get()) is not None:
+            func, args = task
+            try:
+                func(*args)
+                self.written += 1
+            except Exception as e:
+                logging.warning(f"Ошибка записи в allure-results: {e}")
+
+    def _report_item(self, item):
+        # Результат сериализуется сразу: после отправки allure может продолжать менять объект
+        indent = INDENT if os.environ.get("ALLURE_INDENT_OUTPUT") else None
+        filename = item.file_pattern.format(prefix=uuid.uuid4())
+        data = asdict(item, filter=lambda _, v: v or v is False)
+        self._submit(self._write_json, filename, data, indent)
+
+    def _write_json(self, filename: str, data: dict, indent: int | None):
+        with io.open(self._report_dir / filename, "w", encoding="utf8") as json_file:
+            json.dump(data, json_file, indent=indent, ensure_ascii=False)
+
+    @allure_commons.hookimpl
+    def report_result(self, result):
+        self._report_item(result)
+
+    @allure_commons.hookimpl
+    def report_container(self, container):
+        self._report_item(container)
+
+    @allure_commons.hookimpl
+    def report_attached_data(self, body: Any, file_name: str):
+        self._submit(super().report_attached_data, body, file_name)
+
+    def close(self):
+        """Дописывает все из очереди и останавливает поток"""
+        self._queue.put(None)
+        self._thread.join()
+        logging.info(f"Фоновая запись allure завершена: файлов {self.written}, максимум очереди {self.max_queue}")
+
+
+class AllureWriterPlugin:
+    """С --allure-writer=async подменяет файловый логгер allure на AsyncAllureFileLogger
+    на время сессии и возвращает исходный после записи всей очереди"""
+
+    PLUGIN_NAME = "allure_writer"
+
+    def __init__(self, config: pytest.Config):
+        self.config = config
+        self._file_logger: AllureFileLogger | None = None
+        self._async_logger: AsyncAllureFileLogger | None = None
+
+    def pytest_sessionstart(self, session: pytest.Session):
+        if self.config.getoption("--allure-writer") != "async":
+            return
+        plugin_manager = allure_commons.plugin_manager
+        self._file_logger = next(
+            (plugin for plugin in plugin_manager.get_plugins() if type(plugin) is AllureFileLogger), None
+        )
+        if self._file_logger is None:
+            return
+        self._async_logger = AsyncAllureFileLogger(self._file_logger._report_dir)
+        plugin_manager.unregister(self._file_logger)
+        plugin_manager.register(self._async_logger)
+        # Очистка выполняется после завершения сессионных фикстур и раньше очистки allure,
+        # которой нужен исходный логгер
+        self.config.add_cleanup(self.close)
+
+    def close(self):
+        plugin_manager = allure_commons.plugin_manager
+        plugin_manager.unregister(self._async_logger)
+        plugin_manager.register(self._file_logger)
+        self._async_logger.close()
@@ -0,0 +1,303 @@
+import io
+import re
+import json
+import base64
+import random
+import hashlib
+import logging
+import threading
+import httpx
+import pytest
+from faker import Faker
+from pathlib import Path
+from collections import Counter
+from http.client import HTTPResponse as HTTPConnectionResponse
+from typing import Any, NamedTuple
+from urllib.parse import urlsplit, parse_qsl, urlencode
+from requests import ConnectionError, PreparedRequest, Response
+from urllib3 import HTTPResponse, HTTPHeaderDict
+
+# Значения, которые меняются от запуска к запуску. При сравнении запросов они заменяются
+# на имя матчера, а при воспроизведении записанные значения в ответах подменяются текущими
+MATCHERS = {
+    "uuid": re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"),
+    "token": re.compile(r"eyJ[\w-]+\.[\w-]+\.[\w-]*"),
+    "date": re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?")
+}
+# Заголовки, которые описывают передачу, а не содержимое: тело в кассете уже распаковано
+SKIP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+
+
+class CassetteMiss(ConnectionError):
+    """В кассете нет ответа на запрос. Для клиентов выглядит как недоступный сервер"""
+
+
+class CassetteResponse(NamedTuple):
+    status: int
+    reason: str
+    headers: list[tuple[str, str]]
+    content: bytes
+
+
+def normalize(text: str) -> str:
+    for name, matcher in MATCHERS.items():
+        text = matcher.sub("{" + name + "}", text)
+    return text
+
+
+def _decode(data: bytes | None) -> str:
+    try:
+        return (data or b"").decode("utf-8")
+    except UnicodeDecodeError:
+        return "base64:" + base64.b64encode(data).decode("ascii")
+
+
+def _encode(text: str) -> bytes:
+    if text.startswith("base64:"):
+        return base64.b64decode(text[len("base64:"):])
+    return text.encode("utf-8")
+
+
+class Cassette:
+    """Кассета HTTP-запросов для --record и --replay.
+
+    В режиме record каждая пара запрос-ответ дописывается строкой JSON в <dir>/<worker>.jsonl.
+    В режиме replay все файлы каталога загружаются в индекс по ключам от точного к общему:
+    метод, путь, query и хэш тела; метод, путь и query; метод и путь. Значения матчеров
+    в ключах заменены именами, поэтому новые id, токены и даты не мешают совпадению.
+    Из подходящих записей выбирается первая неиспользованная, сначала записанная в том же тесте.
+    Записанные значения матчеров из запроса запоминаются вместе с текущими и подменяются в ответах,
+    так что id, пришедший в ответе, совпадает с тем, что тест отправил.
+    """
+
+    RECORD = "record"
+    REPLAY = "replay"
+
+    def __init__(self, directory: str | Path, mode: str, name: str = "main"):
+        self.directory = Path(directory)
+        self.mode = mode
+        self.test = ""
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._file = None
+        self._index: dict[tuple, list[dict]] = {}
+        self._used: set[int] = set()
+        self._substitutions: dict[str, str] = {}
+        if mode == self.RECORD:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.directory / f"{name}.jsonl", "w", encoding="utf-8")
+        else:
+            self._load()
+
+    @staticmethod
+    def keys(method: str, url: str, body: bytes | None) -> list[tuple]:
+        parts = urlsplit(url)
+        path = normalize(parts.path)
+        query = normalize(urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True))))
+        body_hash = hashlib.sha256(normalize(_decode(body)).encode("utf-8")).hexdigest()[:16]
+        return [(method, path, query, body_hash), (method, path, query), (method, path)]
+
+    def _load(self):
+        files = sorted(self.directory.glob("*.jsonl"))
+        if not files:
+            raise pytest.UsageError(f"В {self.directory} нет кассет, сначала запустите тесты с --record")
+        entries = (json.loads(line) for path in files for line in path.read_text(encoding="utf-8").splitlines())
+        for number, entry in enumerate(entries):
+            entry["id"] = number
+            for key in self.keys(entry["method"], entry["url"], _encode(entry["body"])):
+                self._index.setdefault(key, []).append(entry)
+        logging.info(f"Загружены кассеты {self.directory}: файлов {len(files)}")
+
+    def record(self, method: str, url: str, body: bytes | None, response: CassetteResponse):
+        entry = {
+            "test": self.test,
+            "method": method,
+            "url": url,
+            "body": _decode(body),
+            "status": response.status,
+            "reason": response.reason,
+            "headers": [[name, value] for name, value in response.headers if name.lower() not in SKIP_HEADERS],
+            "content": _decode(response.content)
+        }
+        with self._lock:
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+            self.stats["recorded"] += 1
+
+    def replay(self, method: str, url: str, body: bytes | None) -> CassetteResponse:
+        with self._lock:
+            for level, key in zip(("exact", "query", "path"), self.keys(method, url, body)):
+                entry = self._pick(self._index.get(key, []))
+                if entry is not None:
+                    self.stats[level] += 1
+                    self._learn(f"{entry['url']} {entry['body']}", f"{url} {_decode(body)}")
+                    return CassetteResponse(
+                        status=entry["status"],
+                        reason=entry["reason"],
+                        headers=[(name, self._substitute(value)) for name, value in entry["headers"]],
+                        content=_encode(self._substitute(entry["content"]))
+                    )
+            self.stats["misses"] += 1
+        raise CassetteMiss(f"Нет записи в кассете для {method} {url}")
+
+    def _pick(self, entries: list[dict]) -> dict | None:
+        """Первая неиспользованная запись этого теста, потом любого, потом последняя из подходящих"""
+        if not entries:
+            return None
+        unused = [entry for entry in entries if entry["id"] not in self._used]
+        entry = next((entry for entry in unused if entry["test"] == self.test), None)
+        entry = entry or (unused[0] if unused else entries[-1])
+        self._used.add(entry["id"])
+        return entry
+
+    def _learn(self, recorded: str, current: str):
+        for matcher in MATCHERS.values():
+            recorded_values, current_values = matcher.findall(recorded), matcher.findall(current)
+            if len(recorded_values) != len(current_values):
+                continue
+            for old, new in zip(recorded_values, current_values):
+                if old != new:
+                    self._substitutions[old] = new
+
+    def _substitute(self, text: str) -> str:
+        for old, new in self._substitutions.items():
+            if old in text:
+                text = text.replace(old, new)
+        return text
+
+    def start(self, test: str):
+        """Начало теста: записи выбираются по его nodeid, подмены значений предыдущего теста сбрасываются"""
+        with self._lock:
+            self.test = test
+            self._substitutions.clear()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class _RecordedSocket:
+    def __init__(self, data: bytes):
+        self._file = io.BytesIO(data)
+
+    def makefile(self, *args, **kwargs):
+        return self._file
+
+
+def build_response(adapter, request: PreparedRequest, cassette_response: CassetteResponse) -> Response:
+    """Ответ requests из записи так же, как его собирает HTTPAdapter из ответа http.client,
+    поэтому редиректы и cookie из Set-Cookie обрабатываются как при реальном запросе"""
+    head = f"HTTP/1.1 {cassette_response.status} {cassette_response.reason}\r\n" + "".join(
+        f"{name}: {value}\r\n" for name, value in cassette_response.headers
+    ) + f"Content-Length: {len(cassette_response.content)}\r\n\r\n"
+    original = HTTPConnectionResponse(_RecordedSocket(head.encode("latin-1") + cassette_response.content), method=request.method)
+    original.begin()
+    raw = HTTPResponse(
+        body=original,
+        headers=HTTPHeaderDict(original.getheaders()),
+        status=original.status,
+        reason=original.reason,
+        preload_content=False,
+        decode_content=False,
+        original_response=original
+    )
+    return adapter.build_response(request, raw)
+
+
+class CassetteAsyncTransport(httpx.AsyncBaseTransport):
+    """Запись и воспроизведение для асинхронных сессий поверх общего пула httpx"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, cassette: Cassette):
+        self.transport = transport
+        self.cassette = cassette
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        if self.cassette.mode == Cassette.REPLAY:
+            return self._response(request, self.cassette.replay(request.method, str(request.url), body))
+        response = await self.transport.handle_async_request(request)
+        try:
+            cassette_response = CassetteResponse(
+                status=response.status_code,
+                reason=response.reason_phrase,
+                headers=response.headers.multi_items(),
+                content=await response.aread()
+            )
+        finally:
+            await response.aclose()
+        self.cassette.record(request.method, str(request.url), body, cassette_response)
+        return self._response(request, cassette_response)
+
+    @staticmethod
+    def _response(request: httpx.Request, cassette_response: CassetteResponse) -> httpx.Response:
+        return httpx.Response(
+            status_code=cassette_response.status,
+            headers=[(name, value) for name, value in cassette_response.headers if name.lower() not in SKIP_HEADERS],
+            content=cassette_response.content,
+            request=request
+        )
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class OfflineDb:
+    """БД стенда в режиме --replay: удаления и очистка пропускаются, остальные запросы пропускают тест"""
+
+    def __init__(self, db: Any):
+        self._db = db
+
+    def __getattr__(self, name: str):
+        db_name = type(self._db).__name__
+        if name.startswith(("delete", "clear")):
+            return lambda *args, **kwargs: logging.info(f"--replay: {db_name}.{name} пропущен, стенд не изменяется")
+        pytest.skip(f"{db_name}.{name} обращается к БД стенда, недоступной в режиме --replay")
+
+
+class CassettePlugin:
+    """--record пишет запросы всех сессий в кассеты, --replay отвечает из кассет без сети.
+
+    Чтобы тестовые данные совпадали между записью и воспроизведением, random и Faker
+    перед каждым тестом инициализируются его nodeid.
+    """
+
+    PLUGIN_NAME = "cassette"
+
+    def __init__(self, config: pytest.Config, cassette: Cassette):
+        self.config = config
+        self.cassette = cassette
+
+    @staticmethod
+    def from_config(config: pytest.Config) -> Cassette | None:
+        record, replay = config.getoption("--record"), config.getoption("--replay")
+        if record and replay:
+            raise pytest.UsageError("--record и --replay нельзя использовать вместе")
+        if not (record or replay):
+            return None
+        directory = Path(config.rootpath) / (record or replay)
+        mode = Cassette.RECORD if record else Cassette.REPLAY
+        workerinput = getattr(config, "workerinput", None)
+        if mode == Cassette.RECORD and workerinput is None:
+            # Контроллер стартует раньше воркеров: старые кассеты удаляются до начала записи
+            for path in directory.glob("*.jsonl"):
+                path.unlink()
+        return Cassette(directory, mode, name=workerinput["workerid"] if workerinput else "main")
+
+    def pytest_runtest_logstart(self, nodeid, location):
+        self.cassette.start(nodeid)
+        random.seed(nodeid)
+        Faker.seed(nodeid)
+
+    def pytest_sessionfinish(self, session: pytest.Session):
+        stats = self.cassette.stats
+        if self.cassette.mode == Cassette.RECORD:
+            logging.info(f"Кассеты {self.cassette.directory}: записано {stats['recorded']} запросов")
+        else:
+            logging.info(
+                f"Кассеты {self.cassette.directory}: точных совпадений {stats['exact']}, "
+                f"по query {stats['query']}, по пути {stats['path']}, промахов {stats['misses']}"
+            )
+
+    def pytest_unconfigure(self, config: pytest.Config):
+        self.cassette.close()
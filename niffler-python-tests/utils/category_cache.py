@@ -0,0 +1,61 @@
+import time
+import threading
+from models.category import Category
+
+
+class CategoryCache:
+    """Категории пользователя в памяти клиента по имени и по id.
+
+    Заполняется целиком ответом списка категорий и по одной - ответами добавления и обновления.
+    Запись отдается, пока ей меньше ttl секунд: категории меняются и в обход клиента -
+    через UI, БД и другие воркеры. Наружу отдаются копии, чтобы изменение модели тестом
+    до update_category не попадало в кэш.
+    """
+
+    def __init__(self, ttl: float = 60):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._by_id: dict[str, tuple[Category, float]] = {}
+        self._by_name: dict[str, str] = {}
+
+    def load(self, categories: list[Category]):
+        """Заменяет содержимое кэша полным списком категорий"""
+        now = time.monotonic()
+        with self._lock:
+            self._by_id = {c.id: (self._copy(c), now) for c in categories}
+            self._by_name = {c.name: c.id for c in categories}
+
+    def put(self, category: Category):
+        with self._lock:
+            previous = self._by_id.get(category.id)
+            if previous and self._by_name.get(previous[0].name) == category.id:
+                del self._by_name[previous[0].name]
+            self._by_id[category.id] = (self._copy(category), time.monotonic())
+            self._by_name[category.name] = category.id
+
+    def by_id(self, id: str) -> Category | None:
+        with self._lock:
+            entry = self._by_id.get(id)
+            if entry is None or time.monotonic() - entry[1] >= self.ttl:
+                return None
+            return self._copy(entry[0])
+
+    def by_name(self, name: str) -> Category | None:
+        with self._lock:
+            id = self._by_name.get(name)
+        return self.by_id(id) if id is not None else None
+
+    def invalidate(self, id: str | None = None):
+        """Забывает одну категорию или, без id, все"""
+        with self._lock:
+            if id is None:
+                self._by_id.clear()
+                self._by_name.clear()
+                return
+            entry = self._by_id.pop(id, None)
+            if entry and self._by_name.get(entry[0].name) == id:
+                del self._by_name[entry[0].name]
+
+    @staticmethod
+    def _copy(category: Category) -> Category:
+        return Category.model_validate(category.model_dump())
@@ -7,14 +7,18 @@ from models.config import ClientEnvs
 
 class StandCleaner:
     
-    def __init__(self, spends_db: SpendsDb, auth_db: AuthDb, userdata_db: UserdataDb, client_envs: ClientEnvs):
+    def __init__(
+        self, spends_db: SpendsDb, auth_db: AuthDb, userdata_db: UserdataDb, 
+        client_envs: ClientEnvs, keep_users: list[str] = None
+    ):
         self.spends_db = spends_db
         self.auth_db = auth_db
         self.userdata_db = userdata_db
         self.client_envs = client_envs
+        self.keep_users = keep_users or [client_envs.test_username]
         
     def clean(self):
         self.spends_db.delete_all_spendings()
         self.spends_db.delete_all_categories()
-        self.userdata_db.delete_all_users(exclude=[self.client_envs.test_username])
-        self.auth_db.delete_all_users(exclude=[self.client_envs.test_username])
\ No newline at end of file
+        self.userdata_db.delete_all_users(exclude=self.keep_users)
+        self.auth_db.delete_all_users(exclude=self.keep_users)
\ No newline at end of file
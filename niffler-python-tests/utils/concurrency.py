@@ -0,0 +1,30 @@
+import allure
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Sequence, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def run_in_threads(
+    title: str, func: Callable[[T], R], items: Sequence[T], concurrency: int, thread_name_prefix: str = "worker"
+) -> list[R]:
+    """Выполняет func для всех items в пуле потоков и возвращает результаты в порядке items.
+
+    Пул работает внутри шага allure, открытого в вызывающем потоке: потоки пула прикрепляют
+    свои шаги и вложения к последнему шагу этого потока, без него они попали бы в случайное место отчета.
+    Все вызовы доводятся до конца, затем поднимается первая ошибка.
+    Одна задача выполняется в текущем потоке без пула и отдельного шага.
+    """
+    if len(items) == 1:
+        return [func(items[0])]
+    if not items:
+        return []
+    concurrency = max(min(concurrency, len(items)), 1)
+    with allure.step(f"{title}: {len(items)} в {concurrency} потоков"):
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=thread_name_prefix) as executor:
+            futures = [executor.submit(func, item) for item in items]
+        errors = [future.exception() for future in futures if future.exception()]
+        if errors:
+            raise errors[0]
+        return [future.result() for future in futures]
@@ -0,0 +1,27 @@
+import os
+from dotenv import load_dotenv, find_dotenv
+from models.config import ServerEnvs, ClientEnvs
+
+def load_server_envs() -> ServerEnvs:
+    """Настройки стенда из server.env"""
+    load_dotenv(find_dotenv("server.env"))
+    return ServerEnvs(
+        frontend_url=os.getenv("FRONTEND_URL"),
+        gateway_url=os.getenv("GATEWAY_URL"),
+        auth_url=os.getenv("AUTH_URL"),
+        userdata_url=os.getenv("USERDATA_URL"),
+        spends_db_url=os.getenv("SPENDS_DB_URL"),
+        userdata_db_url=os.getenv("USERDATA_DB_URL"),
+        auth_db_url=os.getenv("AUTH_DB_URL"),
+        kafka_address=os.getenv("KAFKA_ADDRESS"),
+        currency_service_host=os.getenv("CURRENCY_SERVICE_HOST"),
+        wiremock_host=os.getenv("WIREMOCK_HOST")
+    )
+
+def load_client_envs() -> ClientEnvs:
+    """Данные тестового пользователя из client.env"""
+    load_dotenv(find_dotenv("client.env"))
+    return ClientEnvs(
+        test_username=os.getenv("TEST_USERNAME"),
+        test_password=os.getenv("TEST_PASSWORD"),
+    )
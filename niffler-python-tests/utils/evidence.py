@@ -0,0 +1,247 @@
+import os
+import gzip
+import hashlib
+import logging
+import threading
+import allure
+import pytest
+from collections import deque, Counter
+from itertools import groupby
+from typing import Callable, Iterable, NamedTuple
+from allure_commons.types import AttachmentType
+from allure_commons.reporter import AllureReporter
+
+
+class EvidenceAttachment(NamedTuple):
+    body: str | bytes
+    name: str
+    attachment_type: AttachmentType
+    extension: str | None = None
+
+
+class StoredAttachment(NamedTuple):
+    """Файл вложения в allure-results, на который ссылаются дубликаты"""
+    source: str
+    mime_type: str
+    extension: str
+
+
+class AttachmentPolicy:
+    """Размер, сжатие и дедупликация вложений evidence.
+
+    Текстовое тело больше max_bytes заменяется началом и концом с пометкой, сколько байт пропущено,
+    и сохраняется как text/plain.
+    Тело больше gzip_bytes сохраняется в gzip. Одинаковые тела в рамках процесса
+    пишутся один раз, повторные вложения ссылаются на тот же файл в allure-results.
+    Нулевой порог отключает соответствующее правило.
+    """
+
+    def __init__(self, max_bytes: int = 0, gzip_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self.gzip_bytes = gzip_bytes
+        self.reporter: AllureReporter | None = None
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._sources: dict[str, StoredAttachment] = {}
+
+    def attach(self, attachment: EvidenceAttachment):
+        if self.reporter is None:
+            allure.attach(
+                body=attachment.body,
+                name=attachment.name,
+                attachment_type=attachment.attachment_type,
+                extension=attachment.extension
+            )
+            return
+        body = attachment.body.encode("utf-8") if isinstance(attachment.body, str) else attachment.body
+        mime_type, extension = self._mime_type(attachment)
+        # Имя файла выводится из содержимого, поэтому ссылка на дубликат - это то же имя файла
+        prefix = f"{hashlib.sha256(mime_type.encode() + body).hexdigest()[:32]}-{os.getpid()}"
+        # Вложения приходят из потоков пула, поэтому счетчики копятся локально и складываются под блокировкой
+        counts = Counter(attachments=1, bytes_in=len(body))
+        name = attachment.name
+        truncated = bool(self.max_bytes) and len(body) > self.max_bytes and self._is_text(mime_type)
+        if truncated:
+            # Обрезанный JSON или XML уже не разбирается, поэтому вложение становится текстом
+            body = self._preview(body)
+            mime_type, extension = "text/plain", "txt"
+            name = f"{name} (обрезано)"
+        compressed = bool(self.gzip_bytes) and len(body) > self.gzip_bytes
+        if compressed:
+            mime_type, extension = "application/gzip", f"{extension}.gz"
+            name = f"{name} (gzip)"
+        # Тип и расширение файла известны до сжатия, поэтому дубликат, пришедший во время записи
+        # первой копии, уже ссылается на тот файл, который будет записан
+        with self._lock:
+            stored = self._sources.get(prefix)
+            if stored is None:
+                self._sources[prefix] = StoredAttachment(prefix, mime_type, extension)
+        if stored is not None:
+            counts["deduplicated"] += 1
+            self._count(counts)
+            self.reporter._attach(stored.source, name=name, attachment_type=stored.mime_type, extension=stored.extension)
+            return
+        if truncated:
+            counts["truncated"] += 1
+        if compressed:
+            body = gzip.compress(body, compresslevel=6)
+            counts["compressed"] += 1
+        counts["bytes_out"] += len(body)
+        self._count(counts)
+        self.reporter.attach_data(prefix, body, name=name, attachment_type=mime_type, extension=extension)
+
+    def _count(self, counts: Counter):
+        with self._lock:
+            self.stats.update(counts)
+
+    def _preview(self, body: bytes) -> bytes:
+        """Начало и конец тела по max_bytes // 2 байт. Границы сдвигаются внутрь пропуска
+        до начала символа UTF-8, чтобы не резать кириллицу посередине"""
+        half = self.max_bytes // 2
+        head_end, tail_start = half, len(body) - half
+        while head_end > 0 and self._is_continuation(body[head_end]):
+            head_end -= 1
+        while tail_start < len(body) and self._is_continuation(body[tail_start]):
+            tail_start += 1
+        skipped = tail_start - head_end
+        return body[:head_end] + f"\n\n... пропущено {skipped} байт ...\n\n".encode("utf-8") + body[tail_start:]
+
+    @staticmethod
+    def _is_continuation(byte: int) -> bool:
+        return byte & 0xC0 == 0x80
+
+    @staticmethod
+    def _mime_type(attachment: EvidenceAttachment) -> tuple[str, str]:
+        if isinstance(attachment.attachment_type, AttachmentType):
+            return attachment.attachment_type.mime_type, attachment.attachment_type.extension
+        return attachment.attachment_type, (attachment.extension or "attach").lstrip(".")
+
+    @staticmethod
+    def _is_text(mime_type: str) -> bool:
+        return mime_type.startswith("text/") or mime_type.endswith(("json", "xml"))
+
+
+class EvidenceRecord(NamedTuple):
+    """Один запрос к системе: шаг allure и функция, которая готовит его вложения"""
+    step: str
+    factory: Callable[[], Iterable[EvidenceAttachment]]
+
+
+class EvidenceRecorder:
+    """Вложения HTTP, SOAP, SQL и gRPC в зависимости от режима --evidence.
+
+    always - вложения сериализуются и пишутся в allure сразу, как раньше.
+    on-failure - в кольцевой буфер теста кладется только функция-фабрика вложений,
+    а сериализация и запись происходят, если тест упал.
+    off - вложения не создаются.
+    """
+
+    ALWAYS = "always"
+    ON_FAILURE = "on-failure"
+    OFF = "off"
+    MODES = (ALWAYS, ON_FAILURE, OFF)
+
+    def __init__(self, mode: str = ALWAYS, buffer_size: int = 200):
+        self.configure(mode, buffer_size)
+
+    def configure(self, mode: str, buffer_size: int = 200, policy: AttachmentPolicy = None):
+        self.mode = mode
+        self.policy = policy or AttachmentPolicy()
+        self._lock = threading.Lock()
+        self._buffer: deque[EvidenceRecord] = deque(maxlen=buffer_size)
+        self._recorded = 0
+
+    def record(self, step: str, factory: Callable[[], Iterable[EvidenceAttachment]]):
+        """Фиксирует вложения запроса. Вызывается внутри allure.step запроса"""
+        if self.mode == self.OFF:
+            return
+        if self.mode == self.ALWAYS:
+            self._attach(factory)
+            return
+        with self._lock:
+            self._buffer.append(EvidenceRecord(step, factory))
+            self._recorded += 1
+
+    def attach(
+        self, body: str | bytes | Callable[[], str | bytes], name: str,
+        attachment_type: AttachmentType, extension: str = None, step: str = None
+    ):
+        """Одно вложение. body можно передать функцией, чтобы не сериализовать его без надобности"""
+        self.record(step or name, lambda: [
+            EvidenceAttachment(body() if callable(body) else body, name, attachment_type, extension)
+        ])
+
+    def flush(self):
+        """Пишет накопленные вложения в текущий тест allure и очищает буфер"""
+        with self._lock:
+            records, recorded = list(self._buffer), self._recorded
+            self._buffer.clear()
+            self._recorded = 0
+        if not records:
+            return
+        with allure.step(f"Evidence: последние {len(records)} из {recorded} записей"):
+            # Подряд идущие записи одного запроса (например, запрос и ответ gRPC) - в одном шаге
+            for step, group in groupby(records, key=lambda record: record.step):
+                with allure.step(step):
+                    for record in group:
+                        try:
+                            self._attach(record.factory)
+                        except Exception as e:
+                            logging.warning(f"Не удалось сохранить вложение {step}: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._buffer.clear()
+            self._recorded = 0
+
+    def _attach(self, factory: Callable[[], Iterable[EvidenceAttachment]]):
+        for attachment in factory():
+            self.policy.attach(attachment)
+
+
+evidence = EvidenceRecorder()
+
+
+class EvidencePlugin:
+    """Сбрасывает буфер вложений в начале теста и выгружает его в allure, если тест упал"""
+
+    PLUGIN_NAME = "evidence"
+
+    def __init__(self, config: pytest.Config, recorder: EvidenceRecorder = evidence):
+        self.config = config
+        self.recorder = recorder
+        self.recorder.configure(
+            config.getoption("--evidence"),
+            config.getoption("--evidence-buffer"),
+            AttachmentPolicy(config.getoption("--attach-max-bytes"), config.getoption("--attach-gzip-bytes"))
+        )
+        self._failed = False
+
+    def pytest_sessionstart(self, session: pytest.Session):
+        # Слушатель allure регистрируется в его pytest_configure, который может идти позже нашего
+        listener = self.config.pluginmanager.get_plugin("allure_listener")
+        self.recorder.policy.reporter = listener.allure_logger if listener else None
+
+    def pytest_sessionfinish(self, session: pytest.Session):
+        stats = self.recorder.policy.stats
+        if stats:
+            logging.info(
+                f"Вложения evidence: {stats['attachments']}, дубликатов {stats['deduplicated']}, "
+                f"обрезано {stats['truncated']}, сжато {stats['compressed']}, "
+                f"байт {stats['bytes_in']} -> {stats['bytes_out']}"
+            )
+
+    def pytest_runtest_logstart(self, nodeid, location):
+        self.recorder.clear()
+        self._failed = False
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_makereport(self, item, call):
+        report = (yield).get_result()
+        if self.recorder.mode != EvidenceRecorder.ON_FAILURE:
+            return
+        self._failed = self._failed or report.failed
+        if self._failed:
+            self.recorder.flush()
+        elif report.when == "teardown":
+            self.recorder.clear()
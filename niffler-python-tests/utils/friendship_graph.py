@@ -0,0 +1,64 @@
+import logging
+import allure
+from pydantic import BaseModel
+from models.user import UserData
+from utils.user_creator import SoapUserCreator
+
+
+class FriendshipSpec(BaseModel):
+    """Какие связи нужны пользователю owner: friends - друзья, incoming - входящие приглашения,
+    outgoing - исходящие приглашения, strangers - пользователи без связей"""
+    owner: str
+    friends: int = 0
+    incoming: int = 0
+    outgoing: int = 0
+    strangers: int = 0
+
+
+class FriendshipGraph(BaseModel):
+    owner: str
+    friends: list[UserData] = []
+    incoming: list[UserData] = []
+    outgoing: list[UserData] = []
+    strangers: list[UserData] = []
+    
+    @property
+    def users(self) -> list[UserData]:
+        return self.friends + self.incoming + self.outgoing + self.strangers
+
+
+class FriendshipGraphBuilder:
+    """Создает граф связей по FriendshipSpec.
+    
+    С --provision=db пользователи и связи вставляются в БД одной транзакцией на базу,
+    иначе пользователи регистрируются, а связи создаются SOAP-запросами параллельно.
+    """
+    
+    def __init__(self, user_creator: SoapUserCreator):
+        self.user_creator = user_creator
+    
+    def build(self, spec: FriendshipSpec) -> FriendshipGraph:
+        generate = self.user_creator.generate_users
+        graph = FriendshipGraph(
+            owner=spec.owner,
+            friends=generate(spec.friends, "Friend_"),
+            incoming=generate(spec.incoming, "Incoming_"),
+            outgoing=generate(spec.outgoing, "Outgoing_"),
+            strangers=generate(spec.strangers)
+        )
+        friendships = [
+            *[(user.username, spec.owner, "ACCEPTED") for user in graph.friends],
+            *[(user.username, spec.owner, "PENDING") for user in graph.incoming],
+            *[(spec.owner, user.username, "PENDING") for user in graph.outgoing]
+        ]
+        with allure.step(
+            f"Создание графа связей {spec.owner}: друзей {spec.friends}, входящих {spec.incoming}, "
+            f"исходящих {spec.outgoing}, без связей {spec.strangers}"
+        ):
+            self.user_creator.create_linked_users(graph.users, friendships)
+        logging.info(f"Граф связей для {spec.owner} создан: {len(graph.users)} пользователей")
+        return graph
+    
+    def destroy(self, graph: FriendshipGraph):
+        """Удаляет пользователей графа вместе с их связями"""
+        self.user_creator.delete_users(graph.users)
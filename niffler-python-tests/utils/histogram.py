@@ -0,0 +1,101 @@
+import math
+
+
+class Histogram:
+    """Гистограмма задержек в стиле HDR Histogram.
+
+    Значения в секундах хранятся в микросекундах. Диапазон каждой степени двойки делится
+    на одинаковое число линейных корзин, поэтому относительная погрешность перцентиля
+    не больше 1 / 2 ** (precision_bits - 1) при любом масштабе значений, а память
+    зависит только от разброса значений, а не от их количества.
+    Гистограммы с одинаковой точностью складываются без потери точности: это сумма счетчиков корзин.
+    """
+
+    UNIT = 1_000_000
+
+    def __init__(self, precision_bits: int = 8):
+        self.precision_bits = precision_bits
+        self._half = 1 << (precision_bits - 1)
+        self.counts: dict[int, int] = {}
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def record(self, seconds: float, count: int = 1):
+        value = max(int(seconds * self.UNIT), 0)
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.min = value if self.count == 0 else min(self.min, value)
+        self.max = max(self.max, value)
+        self.count += count
+        self.total += value * count
+
+    def _index(self, value: int) -> int:
+        # Значения меньше 2 ** precision_bits хранятся точно, дальше корзина шириной 2 ** shift
+        shift = max(value.bit_length() - self.precision_bits, 0)
+        return shift * self._half + (value >> shift)
+
+    def _highest_value(self, index: int) -> int:
+        shift = max(index // self._half - 1, 0)
+        return (((index - shift * self._half) + 1) << shift) - 1
+
+    def percentile(self, q: float) -> float:
+        """Перцентиль по методу ближайшего ранга: верхняя граница корзины, но не больше максимума"""
+        if self.count == 0:
+            return 0.0
+        rank = max(math.ceil(q / 100 * self.count), 1)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._highest_value(index), self.max) / self.UNIT
+        return self.max / self.UNIT
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count / self.UNIT if self.count else 0.0
+
+    def merge(self, other: "Histogram") -> "Histogram":
+        if other.precision_bits != self.precision_bits:
+            raise ValueError(f"Разная точность гистограмм: {self.precision_bits} и {other.precision_bits}")
+        if other.count == 0:
+            return self
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.min = other.min if self.count == 0 else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+        return self
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": round(self.mean, 4),
+            "p50": round(self.percentile(50), 4),
+            "p95": round(self.percentile(95), 4),
+            "p99": round(self.percentile(99), 4),
+            "max": round(self.max / self.UNIT, 4)
+        }
+
+    def dump(self) -> dict:
+        """Состояние для передачи между процессами (xdist, воркеры нагрузки) и записи в JSON"""
+        return {
+            "precision_bits": self.precision_bits,
+            "counts": {str(index): count for index, count in self.counts.items()},
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max
+        }
+
+    @classmethod
+    def load(cls, data: dict) -> "Histogram":
+        histogram = cls(data["precision_bits"])
+        histogram.counts = {int(index): count for index, count in data["counts"].items()}
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
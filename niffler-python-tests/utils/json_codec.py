@@ -0,0 +1,20 @@
+import json
+from typing import Any
+
+
+def dumps_pretty(data: Any) -> bytes:
+    """JSON с отступами для вложений allure"""
+    return json.dumps(data, indent=4).encode("utf-8")
+
+
+def response_json(response) -> Any:
+    """Тело JSON ответа requests или httpx, разобранное один раз на ответ.
+
+    Результат сохраняется в объекте ответа: клиент и вложения allure используют
+    одну и ту же копию, поэтому изменять ее нельзя.
+    """
+    try:
+        return response._parsed_json
+    except AttributeError:
+        response._parsed_json = json.loads(response.content)
+        return response._parsed_json
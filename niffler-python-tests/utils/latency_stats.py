@@ -0,0 +1,184 @@
+import re
+import json
+import time
+import logging
+import threading
+import pytest
+from pathlib import Path
+from functools import wraps
+from typing import Callable
+from urllib.parse import urlsplit
+from utils.histogram import Histogram
+
+# Сегменты пути, которые являются значениями, а не частью ручки
+ID_SEGMENT = re.compile(r"^(?:[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|\d+)$")
+SOAP_OPERATION = re.compile(r"<(?:[\w-]+:)?(\w+)Request\b")
+
+
+def endpoint_template(url: str) -> str:
+    """Путь без хоста и query, конкретные id заменены на {id}: /api/spends/{id}"""
+    path = urlsplit(str(url)).path or "/"
+    return "/".join("{id}" if ID_SEGMENT.match(segment) else segment for segment in path.split("/"))
+
+
+def soap_operation(xml_data: str) -> str:
+    match = SOAP_OPERATION.search(xml_data or "")
+    return match.group(1) if match else "unknown"
+
+
+class LatencyStats:
+    """Задержки запросов текущего процесса по ручкам: "GET /api/spends/{id}" -> Histogram"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: dict[str, Histogram] = {}
+        self._errors: dict[str, int] = {}
+
+    def record(self, key: str, seconds: float, error: bool = False):
+        with self._lock:
+            self._histograms.setdefault(key, Histogram()).record(seconds)
+            if error:
+                self._errors[key] = self._errors.get(key, 0) + 1
+
+    def dump(self) -> dict:
+        """Гистограммы для передачи из воркера xdist в контроллер"""
+        with self._lock:
+            return {
+                key: {"histogram": histogram.dump(), "errors": self._errors.get(key, 0)}
+                for key, histogram in self._histograms.items()
+            }
+
+    @staticmethod
+    def merge(dumps: list[dict]) -> dict[str, tuple[Histogram, int]]:
+        merged: dict[str, tuple[Histogram, int]] = {}
+        for dump in dumps:
+            for key, data in dump.items():
+                histogram, errors = merged.get(key, (Histogram(), 0))
+                merged[key] = (histogram.merge(Histogram.load(data["histogram"])), errors + data["errors"])
+        return merged
+
+    @staticmethod
+    def summarize(merged: dict[str, tuple[Histogram, int]]) -> dict:
+        return {
+            key: histogram.summary() | {"errors": errors}
+            for key, (histogram, errors) in sorted(merged.items(), key=lambda item: -item[1][0].total)
+        }
+
+
+latency_stats = LatencyStats()
+
+
+def _is_error(response) -> bool:
+    return response.status_code >= 500
+
+
+def http_key(method: str, url: str, *args, **kwargs) -> str:
+    return f"{method.upper()} {endpoint_template(url)}"
+
+
+def soap_key(xml_data: str, *args, **kwargs) -> str:
+    return f"SOAP {soap_operation(xml_data)}"
+
+
+def timed(key: Callable[..., str]):
+    """Замер времени метода сессии. Ключ строится из аргументов вызова без self.
+    Ошибкой считаются исключения и ответы 5xx"""
+    def decorator(function):
+        @wraps(function)
+        def wrapper(self, *args, **kwargs):
+            started = time.perf_counter()
+            error = True
+            try:
+                response = function(self, *args, **kwargs)
+                error = _is_error(response)
+                return response
+            finally:
+                latency_stats.record(key(*args, **kwargs), time.perf_counter() - started, error)
+        return wrapper
+    return decorator
+
+
+def timed_async(key: Callable[..., str]):
+    """timed для async-методов сессии"""
+    def decorator(function):
+        @wraps(function)
+        async def wrapper(self, *args, **kwargs):
+            started = time.perf_counter()
+            error = True
+            try:
+                response = await function(self, *args, **kwargs)
+                error = _is_error(response)
+                return response
+            finally:
+                latency_stats.record(key(*args, **kwargs), time.perf_counter() - started, error)
+        return wrapper
+    return decorator
+
+
+class LatencyStatsPlugin:
+    """Собирает задержки запросов со всех воркеров xdist, выводит p50/p95/p99/max по ручкам
+    в итогах pytest, сохраняет их в logs/latency_stats.json и в environment.properties allure"""
+
+    PLUGIN_NAME = "latency_stats"
+    WORKEROUTPUT_KEY = "latency_stats"
+
+    def __init__(self, config: pytest.Config, stats: LatencyStats = latency_stats):
+        self.config = config
+        self.stats = stats
+        self.report_path = Path(__file__).resolve().parent.parent / "logs" / "latency_stats.json"
+        self._worker_dumps: list[dict] = []
+
+    def pytest_sessionfinish(self, session: pytest.Session):
+        workeroutput = getattr(self.config, "workeroutput", None)
+        if workeroutput is not None:
+            workeroutput[self.WORKEROUTPUT_KEY] = self.stats.dump()
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_testnodedown(self, node, error):
+        dump = getattr(node, "workeroutput", {}).get(self.WORKEROUTPUT_KEY)
+        if dump:
+            self._worker_dumps.append(dump)
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if hasattr(self.config, "workerinput"):
+            return
+        summary = LatencyStats.summarize(LatencyStats.merge([self.stats.dump(), *self._worker_dumps]))
+        if not summary:
+            return
+        self.report_path.parent.mkdir(parents=True, exist_ok=True)
+        self.report_path.write_text(json.dumps(summary, ensure_ascii=False, indent=4), encoding="utf-8")
+        self._write_allure_environment(summary)
+        width = max(len(key) for key in summary)
+        terminalreporter.write_sep("=", "Задержки запросов")
+        terminalreporter.write_line(
+            f"{'endpoint':<{width}} {'count':>6} {'errors':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+        )
+        for key, row in summary.items():
+            terminalreporter.write_line(
+                f"{key:<{width}} {row['count']:>6} {row['errors']:>6} {row['p50']:>7.3f}s "
+                f"{row['p95']:>7.3f}s {row['p99']:>7.3f}s {row['max']:>7.3f}s"
+            )
+        terminalreporter.write_line(f"Отчет: {self.report_path}")
+
+    def _write_allure_environment(self, summary: dict):
+        """Добавляет задержки в environment.properties, который allure показывает в блоке Environment"""
+        report_dir = getattr(self.config.option, "allure_report_dir", None)
+        if not report_dir:
+            return
+        path = Path(report_dir) / "environment.properties"
+        lines = [
+            line for line in (path.read_text(encoding="utf-8").splitlines() if path.exists() else [])
+            if not line.startswith("latency.")
+        ]
+        for key, row in summary.items():
+            # В ключах properties пробел и двоеточие нужно экранировать
+            name = "latency." + key.replace(" ", "\\ ").replace(":", "\\:")
+            lines.append(
+                f"{name}=count {row['count']}, errors {row['errors']}, p50 {row['p50']}s, "
+                f"p95 {row['p95']}s, p99 {row['p99']}s, max {row['max']}s"
+            )
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        except OSError as e:
+            logging.warning(f"Не удалось записать задержки в {path}: {e}")
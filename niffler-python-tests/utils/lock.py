@@ -1,28 +1,223 @@
 import os
+import json
+import time
 import logging
+import threading
+from pathlib import Path
 
-def inc_count(count_path):
-    if not os.path.exists(count_path):
-        with open(count_path, "w") as f:
-            f.write("1")
-        return 1
-    with open(count_path, "r+") as f:
-        count = int(f.read())
-        count += 1
-        f.seek(0)
-        f.write(str(count))
-        f.truncate()
+try:
+    import fcntl
+except ImportError:  # Windows: fcntl недоступен, используем опрос файла-метки
+    fcntl = None
+
+try:
+    import psutil
+except ImportError:  # psutil нужен только для времени старта процесса там, где нет /proc
+    psutil = None
+
+
+class FileLock:
+    """Межпроцессная блокировка на файле.
+
+    На POSIX используется fcntl.flock: ожидающий процесс блокируется в ядре
+    и просыпается сразу после освобождения блокировки, без опроса диска.
+    С shared=True блокировку одновременно держат несколько читателей,
+    а монопольный захват ждет, пока все они ее отпустят. Без fcntl общий режим
+    не поддерживается, и блокировка всегда монопольная.
+    """
+
+    POLLING_INTERVAL = 0.05
+
+    def __init__(self, path: str | Path, shared: bool = False):
+        self.path = Path(path)
+        self.shared = shared
+        self._fd: int | None = None
+        self._acquired_at = 0.0
+        self.wait_time = 0.0
+        self.hold_time = 0.0
+
+    @property
+    def locked(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self):
+        """Ждёт освобождения блокировки и захватывает её"""
+        started = time.perf_counter()
+        if fcntl is None:
+            self._acquire_polling()
+        else:
+            self._acquire_flock()
+        self._acquired_at = time.perf_counter()
+        self.wait_time = self._acquired_at - started
+        if not self.shared:
+            os.write(self._fd, f"locked_by_{os.getpid()}_{threading.get_ident()}".encode())
+
+    def _acquire_flock(self):
+        while True:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX)
+            # Пока мы ждали, владелец мог удалить файл блокировки, и следующий процесс
+            # уже создал новый по тому же пути. Блокировка на удалённом inode ничего не защищает.
+            try:
+                if os.stat(self.path).st_ino == os.fstat(fd).st_ino:
+                    if not self.shared:
+                        os.ftruncate(fd, 0)
+                    self._fd = fd
+                    return
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+    def _acquire_polling(self):
+        while True:
+            try:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o644)
+                return
+            except FileExistsError:
+                time.sleep(self.POLLING_INTERVAL)
+
+    def release(self, unlink: bool = False):
+        """Освобождает блокировку. При unlink=True файл блокировки удаляется, пока она ещё удерживается.
+        
+        Общую блокировку могут держать и другие читатели, поэтому ее файл не удаляется.
+        """
+        if self._fd is None:
+            return
+        try:
+            if (unlink and not self.shared) or fcntl is None:
+                self.path.unlink(missing_ok=True)
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+            self.hold_time = time.perf_counter() - self._acquired_at
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+def _pid_alive(pid: int) -> bool:
+    """Проверяет, что процесс с таким PID ещё существует"""
+    if os.name == "nt":
+        # На Windows os.kill(pid, 0) завершает процесс, поэтому считаем его живым
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _process_start_time(pid: int) -> str | None:
+    """Время старта процесса: вместе с PID однозначно определяет процесс, даже если PID переиспользован.
+    None, если процесса нет или время старта на этой платформе не узнать"""
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+        # Поле 22 (starttime) считается после имени процесса: имя в скобках может содержать пробелы
+        return stat.rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        pass
+    if psutil is not None:
+        try:
+            return repr(psutil.Process(pid).create_time())
+        except psutil.Error:
+            pass
+    return None
+
+
+def _holder_id() -> str:
+    pid = os.getpid()
+    start_time = _process_start_time(pid)
+    return f"{pid}:{start_time}" if start_time else str(pid)
+
+
+def _holder_alive(holder: str) -> bool:
+    """Владелец ссылки жив: PID существует и, если время старта записано, это тот же процесс"""
+    pid, _, start_time = holder.partition(":")
+    if not _pid_alive(int(pid)):
+        return False
+    if not start_time:
+        return True
+    current = _process_start_time(int(pid))
+    return current is None or current == start_time
+
+
+class SharedCounter:
+    """Межпроцессный счетчик ссылок с учётом процессов-владельцев.
+
+    В файле хранится число ссылок каждого процесса: ключ - PID и время старта процесса,
+    чтобы ссылки упавшего процесса не считались живыми, когда его PID получит новый процесс.
+    Изменения выполняются под FileLock и записываются атомарно через os.replace, поэтому упавший процесс не портит файл,
+    а его ссылки отбрасываются при следующем обращении к счетчику.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+
+    def increment(self) -> int:
+        return self._update(1)
+
+    def decrement(self) -> int:
+        return self._update(-1)
+
+    def value(self) -> int:
+        with FileLock(self.lock_path):
+            return sum(self._read().values())
+
+    def _update(self, delta: int) -> int:
+        with FileLock(self.lock_path):
+            holders = self._read()
+            holder = _holder_id()
+            count = holders.get(holder, 0) + delta
+            if count > 0:
+                holders[holder] = count
+            else:
+                holders.pop(holder, None)
+            self._write(holders)
+            return sum(holders.values())
+
+    def _read(self) -> dict[str, int]:
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            raw = None
+        if not isinstance(raw, dict):
+            logging.warning(f"Счетчик {self.path} поврежден или в старом формате, начинаем с нуля")
+            return {}
+        holders = {holder: count for holder, count in raw.items() if _holder_alive(holder)}
+        dead = set(raw) - set(holders)
+        if dead:
+            logging.warning(f"Счетчик {self.path}: отброшены ссылки завершившихся процессов {sorted(dead)}")
+        return holders
+
+    def _write(self, holders: dict[str, int]):
+        if not holders:
+            self.path.unlink(missing_ok=True)
+            return
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(holders, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+def inc_count(count_path) -> int:
+    count = SharedCounter(count_path).increment()
     logging.info(f"lock count {count}")
     return count
 
-def dec_count(count_path):
-    if not os.path.exists(count_path):
-        return 0
-    with open(count_path, "r+") as f:
-        count = int(f.read())
-        count -= 1
-        f.seek(0)
-        f.write(str(count))
-        f.truncate()
+def dec_count(count_path) -> int:
+    count = SharedCounter(count_path).decrement()
     logging.info(f"lock count {count}")
-    return count
\ No newline at end of file
+    return count
@@ -0,0 +1,123 @@
+import os
+import json
+import math
+import threading
+import pytest
+from pathlib import Path
+from collections import defaultdict
+from utils.lock import FileLock
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Перцентиль по методу ближайшего ранга"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(q / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class LockStats:
+    """Время ожидания и удержания блокировок LockManager в текущем процессе"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waits: dict[str, list[float]] = defaultdict(list)
+        self._holds: dict[str, list[float]] = defaultdict(list)
+        self._holders: dict[str, dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+    def record(self, name: str, file_lock: FileLock):
+        """Записывает одно захват-освобождение блокировки"""
+        holder = f"{os.getpid()}_{threading.get_ident()}"
+        with self._lock:
+            self._waits[name].append(file_lock.wait_time)
+            self._holds[name].append(file_lock.hold_time)
+            self._holders[name][holder] += file_lock.hold_time
+
+    def dump(self) -> dict:
+        """Сырые замеры для передачи из воркера xdist в контроллер"""
+        with self._lock:
+            return {
+                name: {
+                    "waits": list(self._waits[name]),
+                    "holds": list(self._holds[name]),
+                    "holders": dict(self._holders[name])
+                }
+                for name in self._waits
+            }
+
+    @staticmethod
+    def merge(dumps: list[dict]) -> dict:
+        merged: dict[str, dict] = {}
+        for dump in dumps:
+            for name, data in dump.items():
+                target = merged.setdefault(name, {"waits": [], "holds": [], "holders": {}})
+                target["waits"] += data["waits"]
+                target["holds"] += data["holds"]
+                for holder, hold in data["holders"].items():
+                    target["holders"][holder] = target["holders"].get(holder, 0.0) + hold
+        return merged
+
+    @staticmethod
+    def summarize(raw: dict) -> dict:
+        summary = {}
+        for name, data in sorted(raw.items(), key=lambda item: -sum(item[1]["waits"])):
+            top_holder, top_hold = max(data["holders"].items(), key=lambda item: item[1])
+            summary[name] = {
+                "acquires": len(data["waits"]),
+                "wait_total": round(sum(data["waits"]), 3),
+                "wait_p95": round(percentile(data["waits"], 95), 3),
+                "wait_max": round(max(data["waits"]), 3),
+                "hold_total": round(sum(data["holds"]), 3),
+                "hold_p95": round(percentile(data["holds"], 95), 3),
+                "top_holder": top_holder,
+                "top_holder_hold": round(top_hold, 3)
+            }
+        return summary
+
+
+lock_stats = LockStats()
+
+
+class LockStatsPlugin:
+    """Собирает статистику блокировок со всех воркеров xdist,
+    выводит ее в итогах pytest и сохраняет в logs/lock_stats.json"""
+
+    PLUGIN_NAME = "lock_stats"
+    WORKEROUTPUT_KEY = "lock_stats"
+
+    def __init__(self, config: pytest.Config, stats: LockStats = lock_stats):
+        self.config = config
+        self.stats = stats
+        self.report_path = Path(__file__).resolve().parent.parent / "logs" / "lock_stats.json"
+        self._worker_dumps: list[dict] = []
+
+    def pytest_sessionfinish(self, session: pytest.Session):
+        workeroutput = getattr(self.config, "workeroutput", None)
+        if workeroutput is not None:
+            workeroutput[self.WORKEROUTPUT_KEY] = self.stats.dump()
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_testnodedown(self, node, error):
+        dump = getattr(node, "workeroutput", {}).get(self.WORKEROUTPUT_KEY)
+        if dump:
+            self._worker_dumps.append(dump)
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if hasattr(self.config, "workerinput"):
+            return
+        summary = LockStats.summarize(LockStats.merge([self.stats.dump(), *self._worker_dumps]))
+        if not summary:
+            return
+        self.report_path.write_text(json.dumps(summary, ensure_ascii=False, indent=4), encoding="utf-8")
+        terminalreporter.write_sep("=", "Статистика блокировок")
+        terminalreporter.write_line(
+            f"{'name':<20} {'acquires':>8} {'wait total':>11} {'wait p95':>9} "
+            f"{'hold total':>11} {'hold p95':>9}  top holder"
+        )
+        for name, row in summary.items():
+            terminalreporter.write_line(
+                f"{name:<20} {row['acquires']:>8} {row['wait_total']:>10.3f}s {row['wait_p95']:>8.3f}s "
+                f"{row['hold_total']:>10.3f}s {row['hold_p95']:>8.3f}s  {row['top_holder']} ({row['top_holder_hold']:.3f}s)"
+            )
+        terminalreporter.write_line(f"Отчет: {self.report_path}")
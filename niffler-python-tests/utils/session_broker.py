@@ -0,0 +1,76 @@
+import logging
+import allure
+import pytest
+from typing import Any, Callable
+
+
+class SessionBroker:
+    """Плагин pytest для общих ресурсов сессии при запуске через xdist.
+
+    Ресурс описывается тем же контрактом, что и в LockManager.acquire_lock:
+    create_func() возвращает JSON-сериализуемые данные, cleanup_func(data) их убирает.
+    Контроллер xdist вызывает create_func один раз до старта воркеров и передает
+    результат через workerinput, а cleanup_func выполняет после завершения всех воркеров.
+    Без xdist брокер ничего не отдает, и фикстуры работают через файловые блокировки.
+    """
+
+    PLUGIN_NAME = "session_broker"
+    WORKERINPUT_KEY = "session_broker"
+
+    def __init__(self, config: pytest.Config):
+        self.config = config
+        self._resources: dict[str, tuple[Callable[[], Any], Callable[[Any], None] | None]] = {}
+        self._data: dict[str, Any] | None = None
+
+    @property
+    def is_controller(self) -> bool:
+        return self.config.pluginmanager.hasplugin("dsession")
+
+    def register(self, name: str, create_func: Callable[[], Any], cleanup_func: Callable[[Any], None] = None):
+        """Подключает ресурс к брокеру. Ресурсы создаются в порядке регистрации"""
+        self._resources[name] = (create_func, cleanup_func)
+
+    def provides(self, name: str) -> bool:
+        """Ресурс уже создан контроллером и доступен этому воркеру"""
+        return name in self._shared_data()
+
+    def get(self, name: str) -> Any:
+        return self._shared_data()[name]
+
+    def _shared_data(self) -> dict[str, Any]:
+        workerinput = getattr(self.config, "workerinput", None)
+        if workerinput is None:
+            return {}
+        return workerinput.get(self.WORKERINPUT_KEY, {})
+
+    def _create_all(self) -> dict[str, Any]:
+        data = {}
+        for name, (create_func, _) in self._resources.items():
+            try:
+                with allure.step(f"Создание ресурса сессии {name}"):
+                    data[name] = create_func()
+                logging.info(f"Ресурс сессии {name} создан в контроллере xdist")
+            except Exception as e:
+                # Воркеры создадут такой ресурс сами через LockManager
+                logging.error(f"Ошибка при создании ресурса сессии {name}: {e}", exc_info=True)
+        return data
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_configure_node(self, node):
+        if self._data is None:
+            self._data = self._create_all()
+        node.workerinput[self.WORKERINPUT_KEY] = self._data
+
+    def pytest_sessionfinish(self, session: pytest.Session):
+        if not self.is_controller or not self._data:
+            return
+        for name, (_, cleanup_func) in reversed(self._resources.items()):
+            data = self._data.get(name)
+            if cleanup_func and data:
+                try:
+                    with allure.step(f"Очистка ресурса сессии {name}"):
+                        cleanup_func(data)
+                    logging.info(f"Ресурс сессии {name} очищен в контроллере xdist")
+                except Exception as e:
+                    logging.error(f"Ошибка при очистке ресурса сессии {name}: {e}", exc_info=True)
+        self._data = None
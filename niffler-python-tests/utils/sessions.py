@@ -1,15 +1,22 @@
+import asyncio
+import httpx
+from typing import Awaitable, Iterable
 from requests import Session, Response
 from urllib.parse import urlparse, parse_qs
-from utils.allure_helpers import allure_attach_request, allure_attach_soap_request
+from utils.allure_helpers import allure_attach_request, allure_attach_soap_request, allure_attach_async_request
+from utils.transport import transport
+from utils.latency_stats import timed, timed_async, http_key, soap_key
 
 class BaseSession(Session):
     """Сессия с прокидыванием base_url и логированием запроса, ответа, хэдеров ответа, хэдеров запроса."""
     def __init__(self, *args, **kwargs):
         """Прокидываем base_url - url авторизации из энвов"""
         super().__init__()
+        transport.mount(self)
         self.base_url = kwargs.pop("base_url", "")
         
     @allure_attach_request
+    @timed(http_key)
     def request(self, method, url, **kwargs) -> Response:
         """Логирование запроса и вклейка base_url."""
         return super().request(method, self.base_url + url, **kwargs)
@@ -23,10 +30,12 @@ class AuthSession(Session):
         code - код авторизации из redirect_uri
         """
         super().__init__()
+        transport.mount(self)
         self.base_url = kwargs.pop("base_url", "")
         self.code: str | None = None
     
     @allure_attach_request
+    @timed(http_key)
     def request(self, method, url, **kwargs) -> Response:
         """Сохраняем все cookies из redirect'a и сохраняем code авторизации из redirect_uri;
         
@@ -47,12 +56,46 @@ class SoapSession(Session):
     
     def __init__(self, *args, **kwargs):
         super().__init__()
+        transport.mount(self)
         self.base_url = kwargs.pop("base_url", "")
         self.headers.update({
             "Content-Type": "text/xml; charset=utf-8"
         })
     
     @allure_attach_soap_request
+    @timed(soap_key)
     def soap_request(self, xml_data: str) -> Response:
         """Отправка SOAP запроса с XML данными"""
-        return self.post(self.base_url + "/ws", data=xml_data)
\ No newline at end of file
+        return self.post(self.base_url + "/ws", data=xml_data)
+
+class AsyncBaseSession(httpx.AsyncClient):
+    """Асинхронная сессия httpx с base_url, общим пулом соединений, ограничением
+    одновременных запросов и логированием запроса и ответа, как у BaseSession."""
+    def __init__(self, base_url: str = "", concurrency: int = 32, **kwargs):
+        """concurrency - сколько запросов сессии выполняется одновременно, остальные ждут семафор.
+        Без transport запросы идут через общий пул транспорта"""
+        kwargs["transport"] = kwargs.get("transport") or transport.async_transport()
+        super().__init__(base_url=base_url, **kwargs)
+        self.semaphore = asyncio.Semaphore(concurrency)
+    
+    @allure_attach_async_request
+    async def request(self, method, url, **kwargs) -> httpx.Response:
+        async with self.semaphore:
+            return await self._timed_request(method, url, **kwargs)
+    
+    @timed_async(http_key)
+    async def _timed_request(self, method, url, **kwargs) -> httpx.Response:
+        # Замер внутри семафора: время ожидания очереди сессии не входит в задержку ручки
+        return await super().request(method, url, **kwargs)
+
+async def gather_all(aws: Iterable[Awaitable]) -> list:
+    """Ждет все корутины и возвращает результаты в порядке передачи.
+    
+    В отличие от asyncio.gather, первая ошибка поднимается только после завершения остальных,
+    чтобы не оставлять запросы висеть в цикле событий.
+    """
+    results = await asyncio.gather(*aws, return_exceptions=True)
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        raise errors[0]
+    return results
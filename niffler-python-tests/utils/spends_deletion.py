@@ -0,0 +1,76 @@
+import time
+import asyncio
+import logging
+from http import HTTPStatus
+from typing import Any, Awaitable, Callable, NamedTuple
+
+
+class DeleteSpendsResult(NamedTuple):
+    """Результат удаления трат: сколько id удалено и какие не удалось удалить после повторов"""
+    deleted: int
+    failed: list[str]
+
+
+class SpendsDeletion:
+    """Удаление трат частями с повторами, общее для SpendsClient и AsyncSpendsClient.
+
+    Клиент передает функцию отправки одной части и сам решает, как выполнять части параллельно.
+    Часть с ошибкой или ответом не 200 повторяется до attempts раз с паузой RETRY_DELAY, 2 * RETRY_DELAY...
+    Удаление по id идемпотентно, поэтому повтор после потерянного ответа безопасен.
+    """
+
+    RETRY_DELAY = 0.2
+
+    def __init__(self, ids: list[str], chunk_size: int, attempts: int = 3):
+        self.ids = ids
+        self.attempts = attempts
+        self.chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+        logging.info(f"Удаление трат: {len(ids)} частями по {chunk_size}")
+
+    @staticmethod
+    def params(chunk: list[str]) -> dict[str, str]:
+        return {"ids": ",".join(chunk)}
+
+    def delete_chunk(self, send: Callable[[list[str]], Any], chunk: list[str]) -> bool:
+        for attempt in range(1, self.attempts + 1):
+            try:
+                self._check(send(chunk))
+                return True
+            except Exception as e:
+                delay = self._failed_attempt(chunk, attempt, e)
+                if delay:
+                    time.sleep(delay)
+        return False
+
+    async def delete_chunk_async(self, send: Callable[[list[str]], Awaitable[Any]], chunk: list[str]) -> bool:
+        for attempt in range(1, self.attempts + 1):
+            try:
+                self._check(await send(chunk))
+                return True
+            except Exception as e:
+                delay = self._failed_attempt(chunk, attempt, e)
+                if delay:
+                    await asyncio.sleep(delay)
+        return False
+
+    def result(self, done: list[bool]) -> DeleteSpendsResult:
+        """Итог по результатам частей в порядке chunks"""
+        failed = [id for chunk, ok in zip(self.chunks, done) if not ok for id in chunk]
+        result = DeleteSpendsResult(deleted=len(self.ids) - len(failed), failed=failed)
+        if failed:
+            logging.error(f"Удалено трат {result.deleted}, не удалось удалить {len(failed)}: {failed}")
+        else:
+            logging.info(f"Удалено трат: {result.deleted}")
+        return result
+
+    @staticmethod
+    def _check(res):
+        if res.status_code != HTTPStatus.OK:
+            raise Exception(f"Код {res.status_code} | Text {res.text}")
+
+    def _failed_attempt(self, chunk: list[str], attempt: int, error: Exception) -> float | None:
+        """Логирует неудачную попытку и возвращает паузу перед следующей, None - попыток больше нет"""
+        logging.warning(f"Ошибка при удалении {len(chunk)} трат, попытка {attempt} из {self.attempts}: {str(error)}")
+        if attempt < self.attempts:
+            return self.RETRY_DELAY * 2 ** (attempt - 1)
+        return None
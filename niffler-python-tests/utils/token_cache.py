@@ -0,0 +1,82 @@
+import os
+import json
+import time
+import base64
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+from models.auth_user import TokenData
+
+
+def decode_jwt_payload(token: str) -> dict:
+    """Возвращает payload JWT без проверки подписи"""
+    return _decode_jwt_part(token, 1)
+
+
+def decode_jwt_header(token: str) -> dict:
+    return _decode_jwt_part(token, 0)
+
+
+def _decode_jwt_part(token: str, index: int) -> dict:
+    part = token.split(".")[index]
+    return json.loads(base64.urlsafe_b64decode(part + "=" * (-len(part) % 4)))
+
+
+class TokenCache:
+    """Кэш токенов на диске, общий для запусков и воркеров.
+
+    Ключ - username и auth_url. Токен отдается повторно, пока до его exp
+    остается больше refresh_margin секунд и (если переданы key_ids) auth-сервис
+    еще знает ключ, которым он подписан: после перезапуска auth ключи генерируются заново.
+
+    Cookie сессии auth в кэш не попадают: срок их жизни на сервере по токену не проверить,
+    а устаревшая cookie, подставленная в браузер, ломает авторизацию UI. Файлы доступны только владельцу.
+    """
+
+    DEFAULT_DIR = Path.home() / ".cache" / "niffler-python-tests" / "tokens"
+
+    def __init__(self, cache_dir: str | Path | None = None, refresh_margin: int = 300):
+        self.cache_dir = Path(cache_dir or os.getenv("NIFFLER_TOKEN_CACHE_DIR") or self.DEFAULT_DIR)
+        self.refresh_margin = refresh_margin
+
+    def _path(self, username: str, auth_url: str) -> Path:
+        key = hashlib.sha256(f"{auth_url}|{username}".encode("utf-8")).hexdigest()[:32]
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, username: str, auth_url: str, key_ids: set[str] | None = None) -> TokenData | None:
+        path = self._path(username, auth_url)
+        try:
+            token_data = TokenData.model_validate_json(path.read_text(encoding="utf-8"))
+            expires_at = decode_jwt_payload(token_data.access_token)["exp"]
+            key_id = decode_jwt_header(token_data.access_token).get("kid")
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Некорректная запись кэша токенов {path}: {e}")
+            return None
+        if expires_at - time.time() < self.refresh_margin:
+            logging.info(f"Токен {username} из кэша истекает, нужен новый")
+            return None
+        if key_ids is not None and key_id not in key_ids:
+            logging.info(f"Токен {username} из кэша подписан неизвестным ключом, нужен новый")
+            return None
+        logging.info(f"Токен {username} взят из кэша")
+        # Записи старого формата могли сохранить cookie
+        return token_data.model_copy(update={"cookies": []})
+
+    def put(self, username: str, auth_url: str, token_data: TokenData):
+        path = self._path(username, auth_url)
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        data = token_data.model_copy(update={"cookies": []}).model_dump_json()
+        # mkstemp создает файл с правами 0600, os.replace подменяет запись целиком
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f"{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
@@ -0,0 +1,218 @@
+import time
+import logging
+import threading
+from functools import partial
+import httpx
+import pytest
+from requests import Session, PreparedRequest, Response
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+from utils.cassette import Cassette, CassetteResponse, CassetteAsyncTransport, CassettePlugin, build_response
+
+
+class _PoolWaitStats:
+    """Считает, сколько раз запрос ждал свободное соединение при заполненном пуле.
+
+    requests не передает pool_timeout, поэтому без pool_timeout пула запрос при pool_block
+    ждал бы соединение бесконечно. С ним после ожидания поднимается EmptyPoolError.
+    """
+
+    def __init__(self, *args, pool_timeout: float | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool_timeout = pool_timeout
+
+    def _get_conn(self, timeout: float | None = None):
+        if timeout is None:
+            timeout = self.pool_timeout
+        if self.pool is not None and self.pool.empty():
+            started = time.perf_counter()
+            try:
+                return super()._get_conn(timeout)
+            finally:
+                self.num_waits = getattr(self, "num_waits", 0) + 1
+                self.wait_time = getattr(self, "wait_time", 0.0) + time.perf_counter() - started
+        return super()._get_conn(timeout)
+
+
+class StatsHTTPConnectionPool(_PoolWaitStats, HTTPConnectionPool):
+    pass
+
+
+class StatsHTTPSConnectionPool(_PoolWaitStats, HTTPSConnectionPool):
+    pass
+
+
+class SharedAdapter(HTTPAdapter):
+    """HTTPAdapter, общий для всех сессий: пул соединений на хост, keep-alive и повторы.
+
+    Повторяются только идемпотентные методы (GET, HEAD, PUT, DELETE, OPTIONS, TRACE)
+    при ошибках соединения и ответах 502/503/504, с экспоненциальной задержкой и джиттером.
+    После исчерпания повторов возвращается последний ответ, чтобы тесты проверяли код как раньше.
+    Потоков больше, чем pool_size, ждут свободное соединение не дольше pool_timeout секунд.
+    """
+
+    def __init__(self, pool_size: int = 32, retries: int = 2, backoff: float = 0.2, pool_timeout: float = 30):
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+        super().__init__(
+            pool_connections=16,
+            pool_maxsize=pool_size,
+            pool_block=True,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=backoff,
+                backoff_jitter=backoff,
+                status_forcelist=(502, 503, 504),
+                raise_on_status=False
+            )
+        )
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": partial(StatsHTTPConnectionPool, pool_timeout=self.pool_timeout),
+            "https": partial(StatsHTTPSConnectionPool, pool_timeout=self.pool_timeout)
+        }
+
+    def close(self):
+        # Сессии закрываются по отдельности, а пул общий: его закрывает Transport.close
+        pass
+
+    def stats(self) -> dict[str, dict]:
+        stats = {}
+        for key in self.poolmanager.pools.keys():
+            pool = self.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            stats[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                "requests": pool.num_requests,
+                "new_connections": pool.num_connections,
+                "reused": max(pool.num_requests - pool.num_connections, 0),
+                "waits": getattr(pool, "num_waits", 0),
+                "wait_time": round(getattr(pool, "wait_time", 0.0), 3)
+            }
+        return stats
+
+
+class CassetteAdapter(SharedAdapter):
+    """SharedAdapter, который пишет ответы в кассету (--record) или отвечает из нее без сети (--replay)"""
+
+    def __init__(self, cassette: Cassette, **kwargs):
+        self.cassette = cassette
+        super().__init__(**kwargs)
+
+    def send(self, request: PreparedRequest, **kwargs) -> Response:
+        body = request.body.encode("utf-8") if isinstance(request.body, str) else request.body
+        if self.cassette.mode == Cassette.REPLAY:
+            return build_response(self, request, self.cassette.replay(request.method, request.url, body))
+        response = super().send(request, **kwargs)
+        self.cassette.record(request.method, request.url, body, CassetteResponse(
+            status=response.status_code,
+            reason=response.reason,
+            headers=list(response.raw.headers.items()),
+            content=response.content
+        ))
+        return response
+
+
+class SharedAsyncTransport(httpx.AsyncHTTPTransport):
+    """Пул соединений httpx, общий для асинхронных клиентов.
+
+    Повторяются только ошибки соединения: повторы по коду ответа httpx не поддерживает.
+    """
+
+    async def aclose(self):
+        # Как и SharedAdapter, пул не закрывается вместе с клиентом: его закрывает Transport.aclose
+        pass
+
+    async def close_pool(self):
+        await super().aclose()
+
+
+class Transport:
+    """Общий HTTP-транспорт для BaseSession, AuthSession и SoapSession.
+
+    Все сессии монтируют один SharedAdapter, поэтому клиенты, в том числе созданные
+    в потоках массовых операций, переиспользуют открытые соединения к хосту.
+    Cookie и заголовки остаются у каждой сессии свои.
+    Асинхронные сессии так же делят один SharedAsyncTransport с теми же настройками.
+    С кассетой запросы обеих групп сессий записываются в нее или воспроизводятся из нее.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.adapter = SharedAdapter()
+        self.pool_size = self.adapter.pool_size
+        self.retries = self.adapter.max_retries.total
+        self.cassette: Cassette | None = None
+        self._async_pool: SharedAsyncTransport | None = None
+        self._async_transport: httpx.AsyncBaseTransport | None = None
+
+    def configure(self, pool_size: int, retries: int, cassette: Cassette | None = None):
+        with self._lock:
+            self.close()
+            if cassette is None:
+                self.adapter = SharedAdapter(pool_size=pool_size, retries=retries)
+            else:
+                self.adapter = CassetteAdapter(cassette, pool_size=pool_size, retries=retries)
+            self.pool_size = pool_size
+            self.retries = retries
+            self.cassette = cassette
+
+    def async_transport(self) -> httpx.AsyncBaseTransport:
+        """Пул для httpx.AsyncClient. Создается при первом обращении и живет до Transport.aclose"""
+        with self._lock:
+            if self._async_transport is None:
+                self._async_pool = SharedAsyncTransport(
+                    limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                    retries=self.retries
+                )
+                self._async_transport = self._async_pool
+                if self.cassette is not None:
+                    self._async_transport = CassetteAsyncTransport(self._async_pool, self.cassette)
+            return self._async_transport
+
+    async def aclose(self):
+        """Закрывает асинхронный пул. Вызывается в том же цикле событий, где пул использовался"""
+        with self._lock:
+            async_pool, self._async_pool, self._async_transport = self._async_pool, None, None
+        if async_pool is not None:
+            await async_pool.close_pool()
+
+    def mount(self, session: Session):
+        session.mount("http://", self.adapter)
+        session.mount("https://", self.adapter)
+
+    def stats(self) -> dict[str, dict]:
+        return self.adapter.stats()
+
+    def close(self):
+        self.adapter.poolmanager.clear()
+        for proxy_manager in self.adapter.proxy_manager.values():
+            proxy_manager.clear()
+
+
+transport = Transport()
+
+
+class TransportPlugin:
+    """Настраивает общий транспорт из опций, с --record/--replay подключает кассету,
+    и пишет статистику пулов в лог по окончании сессии"""
+
+    PLUGIN_NAME = "transport"
+
+    def __init__(self, config: pytest.Config, http_transport: Transport = transport):
+        self.transport = http_transport
+        cassette = CassettePlugin.from_config(config)
+        self.transport.configure(config.getoption("--http-pool-size"), config.getoption("--http-retries"), cassette)
+        if cassette is not None:
+            config.pluginmanager.register(CassettePlugin(config, cassette), CassettePlugin.PLUGIN_NAME)
+
+    def pytest_sessionfinish(self, session: pytest.Session):
+        for host, row in self.transport.stats().items():
+            logging.info(
+                f"HTTP пул {host}: запросов {row['requests']}, новых соединений {row['new_connections']}, "
+                f"переиспользовано {row['reused']}, ожиданий {row['waits']} ({row['wait_time']}s)"
+            )
+        self.transport.close()
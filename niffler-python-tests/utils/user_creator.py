@@ -1,53 +1,272 @@
 import uuid
+import time
+from typing import Any, Callable
+import allure
+import threading
 from clients.oauth_client import OAuthClient
 from faker import Faker
 from databases.auth_db import AuthDb
 from databases.userdata_db import UserdataDb
-from models.user import UserData
+from models.user import UserData, User, Friendship
+from models.auth_user import User as AuthUser
+from datetime import datetime
 from clients.soap_client import SoapClient
 import logging
 import pytest
 import random
+from utils.concurrency import run_in_threads
+from utils.histogram import Histogram
+
+try:
+    import bcrypt
+except ImportError:  # bcrypt нужен только для паролей без готового хэша
+    bcrypt = None
+
+
+class DbUserCreator:
+    """Создает пользователей напрямую в БД auth и userdata.
+    
+    Регистрация через auth, Kafka и консьюмер userdata заменяются двумя транзакциями,
+    поэтому пользователь сразу виден в userdata, и сотни пользователей создаются за миллисекунды.
+    Хэш пароля по умолчанию посчитан заранее: bcrypt на каждого пользователя свел бы выигрыш на нет.
+    """
+    
+    DEFAULT_PASSWORD = "P@ssW0rd"
+    PASSWORD_HASHES = {
+        DEFAULT_PASSWORD: "{bcrypt}$2b$10$Wg2aPI.WKAp1cLekymrotOadsg.MZPN5UDnNnsZaqUs/5VAbbSSfW"
+    }
+    DEFAULT_CURRENCY = "RUB"
+    
+    def __init__(self, auth_db: AuthDb, userdata_db: UserdataDb):
+        self.auth_db = auth_db
+        self.userdata_db = userdata_db
+    
+    @classmethod
+    def password_hash(cls, password: str) -> str:
+        """Хэш пароля в формате DelegatingPasswordEncoder из auth"""
+        if password not in cls.PASSWORD_HASHES:
+            if bcrypt is None:
+                raise ValueError(f"Для пароля нет готового хэша, установите bcrypt или используйте {cls.DEFAULT_PASSWORD}")
+            hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=10)).decode("utf-8")
+            cls.PASSWORD_HASHES[password] = "{bcrypt}" + hashed
+        return cls.PASSWORD_HASHES[password]
+    
+    def create_users(self, users: list[UserData], friendships: list[tuple[str, str, str]] = None) -> list[User]:
+        """Создает пользователей и дружбы (requester, addressee, status) по username.
+        
+        В дружбах можно ссылаться и на уже существующих пользователей userdata.
+        """
+        auth_users = [
+            AuthUser(
+                id=str(uuid.uuid4()),
+                username=user.username,
+                password=self.password_hash(user.password),
+                enabled=True,
+                account_non_expired=True,
+                account_non_locked=True,
+                credentials_non_expired=True
+            )
+            for user in users
+        ]
+        userdata_users = [
+            User(id=uuid.uuid4(), username=user.username, currency=self.DEFAULT_CURRENCY)
+            for user in users
+        ]
+        user_ids = {user.username: str(user.id) for user in userdata_users}
+        friendship_rows = self._friendship_rows(friendships or [], user_ids)
+        with allure.step(f"БД Создание {len(users)} пользователей"):
+            self.auth_db.create_users(auth_users)
+            try:
+                self.userdata_db.create_users(userdata_users, friendship_rows)
+            except Exception:
+                self.auth_db.delete_users([user.username for user in users])
+                raise
+        return userdata_users
+    
+    def add_friendships(self, friendships: list[tuple[str, str, str]]):
+        """Добавляет дружбы (requester, addressee, status) между существующими пользователями"""
+        with allure.step(f"БД Создание {len(friendships)} дружб"):
+            self.userdata_db.add_friendships(self._friendship_rows(friendships, {}))
+    
+    def _friendship_rows(self, friendships: list[tuple[str, str, str]], user_ids: dict[str, str]) -> list[Friendship]:
+        """Строки friendship так же, как их пишет userdata: принятая дружба - две строки ACCEPTED,
+        приглашение - одна строка PENDING от отправителя к получателю"""
+        usernames = {username for requester, addressee, _ in friendships for username in (requester, addressee)}
+        user_ids = user_ids | self._existing_user_ids(usernames - set(user_ids))
+        created_date = datetime.now()
+        rows = []
+        for requester, addressee, status in friendships:
+            pairs = [(requester, addressee)]
+            if status == "ACCEPTED":
+                pairs.append((addressee, requester))
+            rows += [
+                Friendship(
+                    id=None,
+                    requester_id=user_ids[left],
+                    addressee_id=user_ids[right],
+                    status=status,
+                    created_date=created_date
+                )
+                for left, right in pairs
+            ]
+        return rows
+    
+    def _existing_user_ids(self, usernames: set[str], timeout: float = 5) -> dict[str, str]:
+        """id пользователей userdata. Зарегистрированные через auth появляются после Kafka, поэтому ждем"""
+        user_ids = {}
+        deadline = time.time() + timeout
+        while missing := usernames - set(user_ids):
+            if time.time() > deadline:
+                raise AssertionError(f"Пользователи {sorted(missing)} не найдены в userdata за {timeout} секунд")
+            user_ids |= {
+                user.username: str(user.id)
+                for user in self.userdata_db.get_users_by_names(list(missing))
+            }
+            if usernames - set(user_ids):
+                time.sleep(0.3)
+        return user_ids
+    
+    def delete_users(self, usernames: list[str]):
+        with allure.step(f"БД Удаление {len(usernames)} пользователей"):
+            self.userdata_db.delete_users(usernames)
+            self.auth_db.delete_users(usernames)
 
 class SoapUserCreator:
     def __init__(
         self, auth_client: OAuthClient, soap_client: SoapClient, 
-        userdata_db: UserdataDb, auth_db: AuthDb, faker: Faker
+        userdata_db: UserdataDb, auth_db: AuthDb, faker: Faker, concurrency: int = 8,
+        db_user_creator: DbUserCreator = None
     ):
         self.auth_client = auth_client
         self.soap_client = soap_client
         self.userdata_db = userdata_db
         self.auth_db = auth_db
         self.faker = faker
+        self.concurrency = concurrency
+        self.db_user_creator = db_user_creator
         
-    def add_friends(self, users: list[UserData], friends_user: str, count: int = None) -> list[UserData]:
-        for idx, user in enumerate(users):
-            if count and idx >= count:
-                break
-            self.soap_client.send_friend_invitation(user.username, friends_user)
-            self.soap_client.accept_friend_invitation(friends_user, user.username)
+    def add_friends(self, users: list[UserData], friends_user: str, count: int = None):
+        """Делает первых count пользователей друзьями friends_user"""
+        users = users[:count] if count else users
+        self.link_users([(user.username, friends_user, "ACCEPTED") for user in users])
+
+    def link_users(self, friendships: list[tuple[str, str, str]]):
+        """Создает связи (requester, addressee, status): ACCEPTED - дружба, PENDING - приглашение.
+        
+        При создании пользователей через БД связи вставляются одной транзакцией,
+        иначе SOAP-запросы разных пар выполняются параллельно.
+        """
+        if not friendships:
+            return
+        if self.db_user_creator:
+            self.db_user_creator.add_friendships(friendships)
+            return
+        
+        def link(soap_client: SoapClient, friendship: tuple[str, str, str]):
+            requester, addressee, status = friendship
+            soap_client.send_friend_invitation(requester, addressee)
+            if status == "ACCEPTED":
+                soap_client.accept_friend_invitation(addressee, requester)
+        
+        self._run_concurrently(
+            "SOAP Создание связей", friendships, link,
+            client_factory=lambda: SoapClient(self.soap_client.server_envs, self.soap_client.client_envs),
+            close_client=lambda client: client.close()
+        )
 
     def register_users(self, count: int, is_friend: bool = False, is_actions: bool = False) -> list[UserData]:
-        users = []
         add = ""
         if is_friend:
             add = "Friend_"
         elif is_actions:
             add = "Actions_"
         
+        users = self.generate_users(count, add)
+        self.create_linked_users(users)
+        return users
+
+    def generate_users(self, count: int, prefix: str = "") -> list[UserData]:
+        users = []
         for i in range(count):
             number = random.randint(1000, 100000)
-            username = f"{self.faker.first_name()}_{self.faker.word()}_{add}{number}_{i}"
-            password = self.faker.password(length=10)
-            self.auth_client.register(
-                username = username, 
-                password = password
-            )
+            username = f"{self.faker.first_name()}_{self.faker.word()}_{prefix}{number}_{i}"
+            if self.db_user_creator:
+                password = DbUserCreator.DEFAULT_PASSWORD
+            else:
+                password = self.faker.password(length=10)
             users.append(UserData(username=username, password=password))
-            
         return users
 
+    def create_linked_users(self, users: list[UserData], friendships: list[tuple[str, str, str]] = None):
+        """Создает пользователей и связи между ними и уже существующими пользователями"""
+        if self.db_user_creator:
+            self.db_user_creator.create_users(users, friendships)
+        else:
+            self.register_users_bulk(users)
+            self.link_users(friendships or [])
+
+    def register_users_bulk(self, users: list[UserData], concurrency: int = None) -> list[float]:
+        """Параллельно регистрирует пользователей и возвращает время каждой регистрации в секундах.
+        
+        У каждого потока свой OAuthClient, а значит и своя AuthSession с cookie и CSRF-токеном.
+        """
+        return self._run_concurrently(
+            "API Регистрация пользователей", users,
+            lambda auth_client, user: auth_client.register(username=user.username, password=user.password),
+            client_factory=lambda: OAuthClient(server_envs=self.auth_client.server_envs),
+            close_client=lambda client: client.session.close(),
+            concurrency=concurrency
+        )
+
+    def _run_concurrently(
+        self, title: str, items: list, func: Callable[[Any, Any], Any],
+        client_factory: Callable[[], Any], close_client: Callable[[Any], None], concurrency: int = None
+    ) -> list[float]:
+        """Выполняет func(client, item) для всех items в пуле потоков и возвращает время каждого вызова.
+        
+        Клиент создается один на поток: при регистрации OAuthClient хранит в своей сессии CSRF-токен
+        и cookie текущего пользователя, и общий клиент смешал бы их между потоками.
+        Соединения при этом общие: сессии всех клиентов используют один пул транспорта.
+        Все вызовы доводятся до конца, затем поднимается первая ошибка.
+        """
+        if not items:
+            return []
+        concurrency = max(min(concurrency or self.concurrency, len(items)), 1)
+        local = threading.local()
+        clients = []
+        
+        def call(item) -> float:
+            if not hasattr(local, "client"):
+                local.client = client_factory()
+                clients.append(local.client)
+            started = time.perf_counter()
+            func(local.client, item)
+            return time.perf_counter() - started
+        
+        started = time.perf_counter()
+        try:
+            latencies = run_in_threads(title, call, items, concurrency, "user_creator")
+        finally:
+            for client in clients:
+                close_client(client)
+        
+        histogram = Histogram()
+        for latency in latencies:
+            histogram.record(latency)
+        report = (
+            f"{title}: {len(items)} за {time.perf_counter() - started:.3f}s, "
+            f"потоков {concurrency}, "
+            f"p50 {histogram.percentile(50):.3f}s, p95 {histogram.percentile(95):.3f}s, max {max(latencies):.3f}s"
+        )
+        logging.info(report)
+        allure.attach(report, name=f"Время выполнения: {title}", attachment_type=allure.attachment_type.TEXT)
+        return latencies
+
     def delete_users(self, users: list[UserData]) -> None:
+        if self.db_user_creator:
+            self.db_user_creator.delete_users([user.username for user in users])
+            logging.info("Удаление Mock-пользователей для SOAP после тестов завершено")
+            return
         try:
             for user in users:
                 db_user = self.userdata_db.get_user_by_name(user.username)
@@ -0,0 +1,71 @@
+import os
+import logging
+import pytest
+from models.config import ServerEnvs, ClientEnvs
+from clients.oauth_client import OAuthClient
+from utils.token_cache import TokenCache
+
+
+class UserPool:
+    """Пул тестовых пользователей: по одному пользователю на каждый xdist-воркер.
+
+    Нулевой воркер и запуск без xdist работают под пользователем из client.env,
+    остальные воркеры - под его копиями <username>_<index> с тем же паролем.
+    Так тесты разных воркеров не делят траты, категории и профиль,
+    и общие блокировки между ними не нужны.
+    """
+
+    def __init__(self, client_envs: ClientEnvs, size: int = 1):
+        self.client_envs = client_envs
+        self.size = max(size, 1)
+
+    @staticmethod
+    def pool_size(config: pytest.Config) -> int:
+        """Размер пула: число воркеров xdist при --user-pool, иначе один пользователь"""
+        if not config.getoption("--user-pool"):
+            return 1
+        workerinput = getattr(config, "workerinput", None)
+        if workerinput is not None:
+            return int(workerinput["workercount"])
+        return max(int(config.getoption("numprocesses", None) or 0), 1)
+
+    @staticmethod
+    def worker_index() -> int:
+        """Номер текущего воркера xdist (gw3 -> 3), без xdist - 0"""
+        worker = os.getenv("PYTEST_XDIST_WORKER", "gw0")
+        return int(worker.removeprefix("gw") or 0)
+
+    @property
+    def users(self) -> list[ClientEnvs]:
+        return [
+            self.client_envs if index == 0 else ClientEnvs(
+                test_username=f"{self.client_envs.test_username}_{index}",
+                test_password=self.client_envs.test_password
+            )
+            for index in range(self.size)
+        ]
+
+    @property
+    def usernames(self) -> list[str]:
+        return [user.test_username for user in self.users]
+
+    def lease(self, index: int | None = None) -> ClientEnvs:
+        """Пользователь, закрепленный за воркером"""
+        index = self.worker_index() if index is None else index
+        user = self.users[index % self.size]
+        logging.info(f"Воркеру {index} выдан пользователь {user.test_username}")
+        return user
+
+    def provision(self, server_envs: ServerEnvs, token_cache: TokenCache | None = None) -> dict[str, dict]:
+        """Регистрирует всех пользователей пула и получает для каждого токен"""
+        tokens = {}
+        for user in self.users:
+            auth_client = OAuthClient(server_envs=server_envs)
+            try:
+                tokens[user.test_username] = auth_client.get_cached_token(
+                    user.test_username, user.test_password, token_cache
+                ).model_dump()
+            finally:
+                auth_client.session.close()
+        logging.info(f"Пул пользователей подготовлен: {list(tokens)}")
+        return tokens